@@ -0,0 +1,179 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger('encoding')
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+
+# When the client accepts several encodings equally, the first available one wins
+ENCODING_PREFERENCE = ('zstd', 'br', 'gzip')
+
+
+class Variant(NamedTuple):
+    """The representation a client negotiated: body format and content coding"""
+    media_type: str = JSON
+    encoding: Optional[str] = None
+
+    @property
+    def is_plain_json(self) -> bool:
+        return self.media_type == JSON and self.encoding is None
+
+
+class Encoded(NamedTuple):
+    body: bytes
+    media_type: str
+    encoding: Optional[str]
+    # Size of the body before compression
+    size: int
+
+    def headers(self) -> Dict[str, str]:
+        headers = {'Content-Type': self.media_type, 'X-Uncompressed-Length': str(self.size)}
+        if self.encoding:
+            headers['Content-Encoding'] = self.encoding
+        return headers
+
+
+def parse_qvalues(header: Optional[str]) -> Dict[str, float]:
+    """Turn 'gzip;q=0.8, br' into {'gzip': 0.8, 'br': 1.0}"""
+    values: Dict[str, float] = {}
+    for part in (header or '').split(','):
+        token, *params = [item.strip() for item in part.split(';')]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[token.lower()] = q
+    return values
+
+
+class ResponseEncoder:
+    """Negotiates MessagePack bodies and gzip/brotli/zstd compression, and counts the bytes sent"""
+
+    def __init__(self, min_bytes: int = 1024, gzip_level: int = 6, brotli_level: int = 4, zstd_level: int = 3):
+        self.min_bytes = min_bytes
+        self.levels = {'gzip': gzip_level, 'br': brotli_level, 'zstd': zstd_level}
+        self._compressors: Dict[str, Callable[[bytes], bytes]] = {
+            # mtime=0 keeps the output identical for identical input, so cached variants keep their ETag
+            'gzip': lambda data: gzip.compress(data, compresslevel=gzip_level, mtime=0),
+        }
+        if brotli is not None:
+            self._compressors['br'] = lambda data: brotli.compress(data, quality=brotli_level)
+        if zstandard is not None:
+            # Compressor objects are not thread-safe, so make one per call
+            self._compressors['zstd'] = lambda data: zstandard.ZstdCompressor(level=zstd_level).compress(data)
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ResponseEncoder':
+        env = os.environ.get
+        return cls(
+            min_bytes=int(env('DEVTOOLS_COMPRESS_MIN_BYTES', '1024')),
+            gzip_level=int(env('DEVTOOLS_GZIP_LEVEL', '6')),
+            brotli_level=int(env('DEVTOOLS_BROTLI_LEVEL', '4')),
+            zstd_level=int(env('DEVTOOLS_ZSTD_LEVEL', '3')),
+        )
+
+    @property
+    def encodings(self) -> Tuple[str, ...]:
+        return tuple(name for name in ENCODING_PREFERENCE if name in self._compressors)
+
+    @property
+    def media_types(self) -> Tuple[str, ...]:
+        return (JSON, MSGPACK) if msgpack is not None else (JSON,)
+
+    def negotiate(self, headers: Mapping[str, str]) -> Variant:
+        return Variant(self._negotiate_media_type(headers.get('accept')),
+                       self._negotiate_encoding(headers.get('accept-encoding')))
+
+    def _negotiate_media_type(self, accept: Optional[str]) -> str:
+        if msgpack is None or not accept:
+            return JSON
+        values = parse_qvalues(accept)
+        msgpack_q = max(values.get(media_type, 0.0) for media_type in MSGPACK_TYPES)
+        json_q = values.get(JSON, values.get('application/*', values.get('*/*', 0.0)))
+        return MSGPACK if msgpack_q > 0 and msgpack_q >= json_q else JSON
+
+    def _negotiate_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if self.min_bytes <= 0 or not accept_encoding:
+            return None
+        values = parse_qvalues(accept_encoding)
+        best, best_q = None, 0.0
+        for name in self.encodings:
+            q = values.get(name, values.get('*', 0.0))
+            if q > best_q:
+                best, best_q = name, q
+        return best
+
+    def encode(self, variant: Variant, json_body: Optional[bytes] = None, payload: Any = None) -> Encoded:
+        """Render a JSON body, or payload, in the variant's format and compress it if it is large enough"""
+        if variant.media_type == MSGPACK:
+            body = msgpack.packb(json.loads(json_body) if payload is None else payload)
+        else:
+            body = json_body
+
+        size = len(body)
+        encoding = variant.encoding if variant.encoding and size >= self.min_bytes else None
+        if encoding:
+            body = self._compressors[encoding](body)
+        return Encoded(body, variant.media_type, encoding, size)
+
+    def encode_result(self, result, variant: Variant) -> Encoded:
+        if variant.media_type == MSGPACK:
+            return self.encode(variant, payload=result.model_dump(mode='json'))
+        return self.encode(variant, json_body=result.model_dump_json().encode('utf-8'))
+
+    def record(self, headers: Mapping[str, str], sent: Optional[int]) -> None:
+        """Count one response described by Encoded.headers(); sent is None for 304 Not Modified"""
+        key = headers['Content-Type']
+        if 'Content-Encoding' in headers:
+            key += '+' + headers['Content-Encoding']
+        size = int(headers['X-Uncompressed-Length'])
+        with self._lock:
+            stats = self._stats.setdefault(
+                key, {'responses': 0, 'not_modified': 0, 'uncompressed_bytes': 0, 'sent_bytes': 0})
+            if sent is None:
+                stats['not_modified'] += 1
+                return
+            stats['responses'] += 1
+            stats['uncompressed_bytes'] += size
+            stats['sent_bytes'] += sent
+        logger.debug("Sent %s response: %s bytes, %s before compression", key, sent, size)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_variant = {key: dict(value) for key, value in self._stats.items()}
+        return {
+            'encodings': list(self.encodings),
+            'media_types': list(self.media_types),
+            'levels': {name: self.levels[name] for name in self.encodings},
+            'min_bytes': self.min_bytes,
+            'variants': by_variant,
+        }
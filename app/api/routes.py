@@ -1,20 +1,98 @@
-from fastapi import FastAPI, HTTPException
-from typing import Dict, Any
-from ..utils.registry import registry
+import asyncio
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, Dict, Optional
+from ..utils.registry import POOL_TIMEOUT, ToolBusyError, registry
+from ..utils import log
+from ..utils.cache import ResponseCache, cache_key, etag_matches
+from ..utils.pipeline import Pipeline, PipelineError, PipelineRequest
+from ..utils.resources import run_metered
+from ..utils.uploads import upload_dir
+from .encoding import ResponseEncoder, Variant
 from app.tools.core.text_tools import TextCaseConverter
 from app.tools.core.url_tools import URLEncoder
 from app.tools.core.json_tools import JSONTool
+from app.tools.core.json_query import JSONQueryTool
 from app.tools.core.crypto_tools import CryptoTool
 from app.tools.core.class_generator import ClassGenerator
 from app.tools.core.pdf_excel_tools import PDFToExcelConverter
+from app.tools.core.excel_reader import ROW_WRITERS, ExcelReaderTool
+from app.tools.core.table_writers import WRITERS
 
 registry.register(TextCaseConverter)
 registry.register(URLEncoder)
 registry.register(JSONTool)
+registry.register(JSONQueryTool)
 registry.register(CryptoTool)
 registry.register(ClassGenerator)
 registry.register(PDFToExcelConverter)
-app = FastAPI(title="DevTools Hub API")
+registry.register(ExcelReaderTool)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Set up the queued logging pipeline unless the launcher already did
+    if not log.is_configured():
+        log.configure_logging()
+    # Warm every tool (e.g. start tabula's JVM) before accepting traffic
+    await run_in_threadpool(registry.startup)
+    yield
+    await run_in_threadpool(registry.shutdown)
+
+app = FastAPI(title="DevTools Hub API", lifespan=lifespan)
+
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Results of streamed conversions wait here until downloaded or expired
+RESULTS_DIR = os.path.join(tempfile.gettempdir(), "devtools-results")
+RESULT_TTL = int(os.environ.get("DEVTOOLS_RESULT_TTL", "3600"))
+
+# Responses of deterministic tools, see BaseTool.deterministic
+response_cache = ResponseCache.from_env()
+
+# Compression and MessagePack for tool results, negotiated from Accept and Accept-Encoding
+response_encoder = ResponseEncoder.from_env()
+
+# Conversion metadata sent in a response header is kept below this many
+# bytes, as proxies and clients reject larger headers
+METADATA_HEADER_LIMIT = 8 * 1024
+
+# Requests waiting for an instance of a pooled tool, see _run_pooled
+_admission: Dict[str, asyncio.Semaphore] = {}
+
+@app.exception_handler(ToolBusyError)
+async def tool_busy_handler(request: Request, exc: ToolBusyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag log records with the caller's X-Request-ID, or a fresh one"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = log.request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        log.request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.get("/health")
+async def health():
+    """Report whether every warmed tool can serve requests"""
+    status = registry.health()
+    healthy = all(status.values())
+    return JSONResponse(status_code=200 if healthy else 503,
+                        content={"healthy": healthy, "tools": status})
 
 @app.get("/tools")
 async def list_tools():
@@ -29,12 +107,353 @@ async def list_tools():
     }
 
 @app.post("/tools/{tool_name}")
-async def execute_tool(tool_name: str, params: Dict[str, Any]):
+async def execute_tool(tool_name: str, params: Dict[str, Any], request: Request):
     """Execute a specific tool"""
     tool_class = registry.get_tool(tool_name)
     if not tool_class:
-        raise HTTPException(status_code=404, message="Tool not found")
+        raise HTTPException(status_code=404, detail="Tool not found")
+
+    variant = response_encoder.negotiate(request.headers)
+    cacheable = tool_class.deterministic and response_cache.enabled
+    if cacheable:
+        key = cache_key(tool_name, params)
+        entry = await _cached_variant(key, variant)
+        # One hit or miss per request, however many representations were looked up
+        response_cache.record(entry is not None)
+        if entry is not None:
+            return _cached_response(entry, request, "HIT")
+
+    result = await _run_pooled(tool_name, params)
+    if result.success and hasattr(result.data, 'read'):
+        # Binary results (e.g. converted spreadsheets) cannot go into JSON
+        return StreamingResponse(_iter_file(result.data), media_type="application/octet-stream")
+    if cacheable and result.success:
+        # Resource figures describe this run only: keep them out of the cached body, or every
+        # hit and 304 would repeat them, and report them in a header instead
+        metadata = dict(result.metadata or {})
+        resources = metadata.pop('resources', None)
+        body = result.model_copy(update={'metadata': metadata or None}).model_dump_json().encode('utf-8')
+        response_cache.set(key, body, response_encoder.encode(Variant(), body).headers())
+        entry = await _cached_variant(key, variant)
+        if entry is not None:
+            response = _cached_response(entry, request, "MISS")
+            if resources:
+                response.headers["X-Tool-Resources"] = json.dumps(resources, separators=(',', ':'))
+            return response
+    return await _encoded_response(result, variant)
+
+async def _cached_variant(key: str, variant: Variant):
+    """The cached result in the negotiated representation, encoded on first use and cached next to the JSON.
+
+    Lookups here are not counted in the cache stats; the caller records one hit or miss per request.
+    """
+    if variant.is_plain_json:
+        return response_cache.peek(key)
+    variant_key = f"{key}:{variant.media_type}:{variant.encoding}"
+    entry = response_cache.peek(variant_key)
+    if entry is None:
+        plain = response_cache.peek(key)
+        if plain is None:
+            return None
+        encoded = await run_in_threadpool(response_encoder.encode, variant, plain.body)
+        # Every representation gets its own ETag, since the encoding is deterministic it stays stable
+        entry = response_cache.set(variant_key, encoded.body, encoded.headers())
+    return entry
+
+def _cached_response(entry, request: Request, status: str) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"private, max-age={int(response_cache.ttl)}",
+        "Vary": "Accept, Accept-Encoding",
+        "X-Cache": status,
+    }
+    if etag_matches(request.headers.get("If-None-Match"), entry.etag):
+        response_encoder.record(entry.headers, None)
+        return Response(status_code=304, headers=headers)
+    response_encoder.record(entry.headers, len(entry.body))
+    return Response(content=entry.body, headers={**entry.headers, **headers})
+
+async def _encoded_response(result, variant: Variant) -> Response:
+    encoded = await run_in_threadpool(response_encoder.encode_result, result, variant)
+    response_encoder.record(encoded.headers(), len(encoded.body))
+    return Response(content=encoded.body, headers={**encoded.headers(), "Vary": "Accept, Accept-Encoding"})
+
+@app.post("/pipelines")
+async def run_pipeline(pipeline: PipelineRequest, request: Request):
+    """Run several tools in one request, passing each step's output to the next"""
+    try:
+        # Steps go through _run_pooled, so pooled tools wait for admission on the event loop
+        result = await Pipeline(registry, pipeline, runner=_run_pooled).run()
+    except PipelineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result.success and hasattr(result.data, 'read'):
+        return StreamingResponse(_iter_file(result.data), media_type="application/octet-stream")
+    return await _encoded_response(result, response_encoder.negotiate(request.headers))
+
+@app.get("/metrics")
+async def metrics():
+    """Response sizes per representation and response cache usage"""
+    return {"responses": response_encoder.stats(), "cache": response_cache.stats()}
+
+async def _run_pooled(tool_name: str, params: Dict[str, Any], output_file: Optional[str] = None):
+    """Run a tool in the threadpool once one of its instances is free.
+
+    Requests for a pooled tool wait here, on the event loop, rather than in a
+    threadpool thread: a burst of PDF conversions must not take every thread
+    that other requests need. Gives up with 503 after DEVTOOLS_POOL_TIMEOUT.
+    """
+    tool_class = registry.get_tool(tool_name)
+    if tool_class is None or tool_class.pool_size <= 1:
+        return await run_in_threadpool(_run_tool, tool_name, params, output_file)
+    semaphore = _admission.setdefault(tool_name, asyncio.Semaphore(tool_class.pool_size))
+    try:
+        await asyncio.wait_for(semaphore.acquire(), POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ToolBusyError(f"All {tool_class.pool_size} instances of {tool_name} are busy")
+    try:
+        return await run_in_threadpool(_run_tool, tool_name, params, output_file)
+    finally:
+        semaphore.release()
+
+def _run_tool(tool_name: str, params: Dict[str, Any], output_file: Optional[str] = None):
+    with registry.acquire(tool_name) as tool:
+        return run_metered(tool, params, output_file)
+
+def _iter_file(f, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    with f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+def _remove_files(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+def _metadata_header(metadata: Optional[Dict[str, Any]]) -> str:
+    """Encode a conversion's metadata for the X-Conversion-Metadata header.
+
+    Lists (e.g. the per-page report of a long PDF) that push it past
+    METADATA_HEADER_LIMIT are left out, largest first, and named in "omitted".
+    """
+    metadata = dict(metadata or {})
+
+    def encode(value: Any) -> str:
+        return json.dumps(value, separators=(',', ':'), default=str)
+
+    encoded = encode(metadata)
+    lists = sorted((key for key, value in metadata.items() if isinstance(value, list)),
+                   key=lambda key: len(encode(metadata[key])), reverse=True)
+    for key in lists:
+        if len(encoded) <= METADATA_HEADER_LIMIT:
+            break
+        del metadata[key]
+        metadata.setdefault('omitted', []).append(key)
+        encoded = encode(metadata)
+    return encoded
+
+async def _spool_upload(upload: UploadFile, suffix: str, directory: Optional[str] = None) -> str:
+    """Copy an upload to a named temp file (in directory, if given) chunk by chunk and return its path"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=directory) as spooled:
+        try:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(spooled.write, chunk)
+        except BaseException:
+            spooled.close()
+            _remove_files(spooled.name)
+            raise
+    return spooled.name
+
+@app.post("/pdf/convert")
+async def convert_pdf(
+    file: UploadFile = File(..., description="PDF document"),
+    extraction_method: str = Form("tabula"),
+    pages: str = Form("all"),
+    password: str = Form(""),
+    merge_tables: bool = Form(False),
+    output_format: str = Form("xlsx"),
+):
+    """Upload a PDF as multipart form data and download the converted file"""
+    if output_format not in WRITERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported output format: {output_format}")
+    writer_cls = WRITERS[output_format]
+
+    pdf_path = await _spool_upload(file, '.pdf')
+    fd, output_path = tempfile.mkstemp(suffix=writer_cls.extension)
+    os.close(fd)
+
+    try:
+        result = await _run_pooled(PDFToExcelConverter.__name__, {
+            "pdf_file": pdf_path,
+            "extraction_method": extraction_method,
+            "pages": pages,
+            "password": password,
+            "merge_tables": merge_tables,
+            "output_format": output_format,
+        }, output_path)
+    except BaseException:
+        _remove_files(pdf_path, output_path)
+        raise
+
+    if not result.success:
+        _remove_files(pdf_path, output_path)
+        return JSONResponse(status_code=422, content=result.model_dump())
+
+    base_name = os.path.splitext(os.path.basename(file.filename or 'converted'))[0]
+    return FileResponse(
+        output_path,
+        media_type=writer_cls.mime_type,
+        filename=base_name + writer_cls.extension,
+        headers={
+            "X-Conversion-Message": result.message or "",
+            "X-Conversion-Metadata": _metadata_header(result.metadata),
+        },
+        background=BackgroundTask(_remove_files, pdf_path, output_path),
+    )
+
+@app.post("/pdf/convert/stream")
+async def convert_pdf_stream(
+    file: UploadFile = File(..., description="PDF document"),
+    extraction_method: str = Form("tabula"),
+    pages: str = Form("all"),
+    password: str = Form(""),
+    merge_tables: bool = Form(False),
+    output_format: str = Form("xlsx"),
+    partial_results: bool = Form(True),
+):
+    """Upload a PDF and follow the conversion as server-sent events.
+
+    Emits "start", "page" (pages done, tables found, estimated seconds left)
+    and "table" events (with the table's rows as NDJSON when partial_results
+    is set), then "done" with the URL of the converted file, or "error".
+    """
+    if output_format not in WRITERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported output format: {output_format}")
+    writer_cls = WRITERS[output_format]
+
+    pdf_path = await _spool_upload(file, '.pdf')
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    await run_in_threadpool(_sweep_results)
+    result_id = uuid.uuid4().hex
+    output_path = os.path.join(RESULTS_DIR, result_id + writer_cls.extension)
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_progress(event: Dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    async def convert() -> None:
+        try:
+            result = await _run_pooled(PDFToExcelConverter.__name__, {
+                "pdf_file": pdf_path,
+                "extraction_method": extraction_method,
+                "pages": pages,
+                "password": password,
+                "merge_tables": merge_tables,
+                "output_format": output_format,
+                "progress_callback": on_progress,
+                "partial_results": partial_results,
+            }, output_path)
+            if result.success:
+                events.put_nowait({
+                    "event": "done",
+                    "message": result.message,
+                    "metadata": result.metadata,
+                    "download_url": f"/pdf/results/{result_id}",
+                })
+            else:
+                _remove_files(output_path)
+                events.put_nowait({"event": "error", "message": result.message})
+        except Exception as e:
+            _remove_files(output_path)
+            events.put_nowait({"event": "error", "message": str(e)})
+        finally:
+            _remove_files(pdf_path)
+            events.put_nowait(None)
+
+    # The conversion keeps running if the client goes away; its file expires with the other results
+    task = asyncio.create_task(convert())
+
+    async def stream():
+        while (event := await events.get()) is not None:
+            yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+        await task
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/excel/convert")
+async def convert_excel(
+    file: UploadFile = File(..., description="Excel workbook (.xlsx)"),
+    output_format: str = Form("csv"),
+    sheets: str = Form("", description="Comma-separated sheet names or numbers; empty for all"),
+    cell_range: str = Form("", alias="range", description="Cell range such as B2:F100"),
+    header: str = Form("auto", description="auto, true or false"),
+    skip_empty: bool = Form(True),
+):
+    """Upload a workbook and download its sheets as CSV, NDJSON or JSON, converted row by row"""
+    if output_format not in ROW_WRITERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported output format: {output_format}")
+    if header not in ("auto", "true", "false"):
+        raise HTTPException(status_code=400, detail="header must be auto, true or false")
+    sheet_list = [name.strip() for name in sheets.split(",") if name.strip()] or None
+
+    # ExcelReaderTool only reads uploads from their own directory
+    excel_path = await _spool_upload(file, '.xlsx', upload_dir('excel'))
+    fd, output_path = tempfile.mkstemp()
+    os.close(fd)
+
+    try:
+        result = await _run_pooled(ExcelReaderTool.__name__, {
+            "excel_file": excel_path,
+            "output_format": output_format,
+            "sheets": sheet_list,
+            "range": cell_range,
+            "header": {"auto": "auto", "true": True, "false": False}[header],
+            "skip_empty": skip_empty,
+        }, output_path)
+    except BaseException:
+        _remove_files(excel_path, output_path)
+        raise
+
+    if not result.success:
+        _remove_files(excel_path, output_path)
+        return JSONResponse(status_code=422, content=result.model_dump())
+
+    extension, mime_type = ROW_WRITERS[output_format].output_type(len(result.metadata['sheets']))
+    base_name = os.path.splitext(os.path.basename(file.filename or 'converted'))[0]
+    return FileResponse(
+        output_path,
+        media_type=mime_type,
+        filename=base_name + extension,
+        headers={
+            "X-Conversion-Message": result.message or "",
+            "X-Conversion-Metadata": _metadata_header(result.metadata),
+        },
+        background=BackgroundTask(_remove_files, excel_path, output_path),
+    )
+
+@app.get("/pdf/results/{result_id}")
+async def download_result(result_id: str):
+    """Download the file produced by a streamed conversion"""
+    if not re.fullmatch(r"[0-9a-f]{32}", result_id):
+        raise HTTPException(status_code=404, detail="Result not found")
+    matches = glob.glob(os.path.join(RESULTS_DIR, result_id + ".*"))
+    if not matches:
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    path = matches[0]
+    extension = os.path.splitext(path)[1]
+    mime_type = next((w.mime_type for w in WRITERS.values() if w.extension == extension), "application/octet-stream")
+    return FileResponse(path, media_type=mime_type, filename="converted" + extension)
 
-    tool = tool_class()
-    result = tool.execute(params)
-    return result
+def _sweep_results() -> None:
+    cutoff = time.time() - RESULT_TTL
+    for path in glob.glob(os.path.join(RESULTS_DIR, "*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass
@@ -7,17 +7,26 @@ from tools.core.text_tools import TextCaseConverter
 from utils.registry import registry
 from tools.core.url_tools import URLEncoder
 from tools.core.json_tools import JSONTool
+from tools.core.json_query import JSONQueryTool
 from tools.core.crypto_tools import CryptoTool
 from tools.core.class_generator import ClassGenerator
 from tools.core.pdf_excel_tools import PDFToExcelConverter
+from tools.core.excel_reader import ExcelReaderTool
 
 # Register tools
 registry.register(TextCaseConverter)
 registry.register(URLEncoder)
 registry.register(JSONTool)
+registry.register(JSONQueryTool)
 registry.register(CryptoTool)
 registry.register(ClassGenerator)
 registry.register(PDFToExcelConverter)
+registry.register(ExcelReaderTool)
+
+@st.cache_resource
+def get_tool(tool_name: str):
+    """Set-up tool instance shared by every rerun and session"""
+    return registry.get_instance(tool_name)
 
 def main():
     st.set_page_config(
@@ -36,9 +45,9 @@ def main():
         options=list(tools.keys()),
         format_func=lambda x: tools[x].__name__
     )
-    # Create and render selected tool
+    # Render the selected tool
     if tool_name:
-        tool = tools[tool_name]()
+        tool = get_tool(tool_name)
         tool.render_ui()
 
 if __name__ == "__main__":
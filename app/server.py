@@ -0,0 +1,212 @@
+import gc
+import importlib
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from app.utils.resources import current_rss
+from app.utils.workers import shutdown_pools
+
+logger = logging.getLogger('server')
+
+# Heavy modules imported in the master before forking so that every worker
+# shares their pages copy-on-write instead of importing its own copy.
+# The JVM itself is NOT started here: JVM threads do not survive fork(), so
+# jpype is only imported and each worker starts its own JVM lazily.
+PRELOAD_MODULES = [
+    'pandas',
+    'openpyxl',
+    'pdfplumber',
+    'PyPDF2',
+    'tabula',
+    'jpype',
+    'Crypto.Cipher.AES',
+    'Crypto.Cipher.DES3',
+    'rsa',
+]
+
+
+def preload_modules(modules=PRELOAD_MODULES) -> None:
+    """Import heavy optional modules ahead of fork"""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.warning("Preload skipped, module not available: %s", name)
+
+
+class PreforkServer:
+    """Serve an ASGI app from N forked uvicorn workers sharing one socket.
+
+    The master binds the listening socket, imports the application and heavy
+    libraries, then forks workers. Workers are recycled after a number of
+    requests or when their RSS crosses a threshold, and are respawned by the
+    master. SIGTERM/SIGINT drain gracefully, SIGHUP recycles every worker.
+    """
+
+    def __init__(self, app: str, host: str = '0.0.0.0', port: int = 8000,
+                 workers: int = 2, max_requests: int = 0,
+                 max_requests_jitter: int = 0, max_memory_mb: int = 0,
+                 graceful_timeout: int = 30, backlog: int = 2048,
+                 log_level: str = 'info'):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_memory_mb = max_memory_mb
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.log_level = log_level
+
+        self._sock: Optional[socket.socket] = None
+        self._app_obj = None
+        self._children: Dict[int, int] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        if not hasattr(os, 'fork'):
+            logger.warning("os.fork is unavailable, falling back to uvicorn's spawn-based workers")
+            uvicorn.run(self.app, host=self.host, port=self.port, workers=self.workers,
+                        limit_max_requests=self.max_requests or None,
+                        timeout_graceful_shutdown=self.graceful_timeout,
+                        log_level=self.log_level, log_config=None)
+            return
+
+        self._sock = self._bind()
+        self._app_obj = import_from_string(self.app)
+        preload_modules()
+        # Move everything imported so far into the permanent generation so the
+        # cyclic GC in the workers does not touch (and thus copy) those pages.
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_recycle)
+        signal.signal(signal.SIGALRM, self._handle_kill)
+
+        logger.info("Master %s listening on %s:%s with %s workers",
+                    os.getpid(), self.host, self.port, self.workers)
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            worker_id = self._children.pop(pid, None)
+            if worker_id is None or self._stopping:
+                continue
+
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code != 0:
+                logger.warning("Worker %s (pid %s) exited with %s, respawning", worker_id, pid, exit_code)
+                # Avoid a tight crash loop when a worker cannot start
+                time.sleep(1)
+            else:
+                logger.info("Worker %s (pid %s) recycled, respawning", worker_id, pid)
+            self._spawn(worker_id)
+
+        self._sock.close()
+        logger.info("Master %s stopped", os.getpid())
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, worker_id: int) -> None:
+        pid = os.fork()
+        if pid:
+            self._children[pid] = worker_id
+            return
+
+        # Child: restore default handlers, uvicorn installs its own
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGALRM):
+            signal.signal(sig, signal.SIG_DFL)
+        random.seed()
+        exit_code = 0
+        try:
+            self._serve(worker_id)
+        except Exception:
+            logger.exception("Worker %s crashed", worker_id)
+            exit_code = 1
+        finally:
+            # os._exit skips atexit, and isolation workers run in sessions of
+            # their own: stop them here or they outlive this process
+            shutdown_pools()
+            os._exit(exit_code)
+
+    def _serve(self, worker_id: int) -> None:
+        limit = None
+        if self.max_requests > 0:
+            limit = self.max_requests + random.randint(0, max(0, self.max_requests_jitter))
+
+        config = uvicorn.Config(
+            self._app_obj,
+            log_level=self.log_level,
+            # Keep uvicorn's loggers flowing into the queued root handler
+            log_config=None,
+            limit_max_requests=limit,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        server = uvicorn.Server(config)
+        if self.max_memory_mb > 0:
+            threading.Thread(
+                target=self._watch_memory, args=(server, worker_id), daemon=True
+            ).start()
+
+        logger.info("Worker %s started (pid %s, max requests %s)", worker_id, os.getpid(), limit)
+        server.run(sockets=[self._sock])
+
+    def _watch_memory(self, server: uvicorn.Server, worker_id: int, interval: float = 5.0) -> None:
+        limit = self.max_memory_mb * 1024 * 1024
+        while not server.should_exit:
+            rss = current_rss()
+            if rss is not None and rss > limit:
+                logger.warning("Worker %s RSS %.1f MB exceeds %s MB, recycling",
+                               worker_id, rss / 1024 / 1024, self.max_memory_mb)
+                server.should_exit = True
+                return
+            time.sleep(interval)
+
+    def _signal_children(self, sig: int) -> None:
+        for pid in list(self._children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _handle_stop(self, signum, frame) -> None:
+        if self._stopping:
+            return
+        logger.info("Received %s, draining workers", signal.Signals(signum).name)
+        self._stopping = True
+        self._signal_children(signal.SIGTERM)
+        if self.graceful_timeout > 0:
+            # Workers that have not drained by then are killed
+            signal.alarm(self.graceful_timeout + 5)
+
+    def _handle_recycle(self, signum, frame) -> None:
+        logger.info("Received SIGHUP, recycling workers")
+        self._signal_children(signal.SIGTERM)
+
+    def _handle_kill(self, signum, frame) -> None:
+        if self._children:
+            logger.warning("Graceful timeout reached, killing %s workers", len(self._children))
+            self._signal_children(signal.SIGKILL)
@@ -1,17 +1,78 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, NamedTuple, Optional, Tuple
 from pydantic import BaseModel
 
 class ToolResult(BaseModel):
     success: bool
     data: Any
     message: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+class Budget(NamedTuple):
+    """Limits on one execution of a tool; None means unlimited"""
+    max_pages: Optional[int] = None
+    max_input_bytes: Optional[int] = None
+    # Seconds of wall time
+    timeout: Optional[float] = None
+    # Memory the execution may allocate on top of what the process already maps
+    max_memory_mb: Optional[int] = None
+
+    @property
+    def isolated(self) -> bool:
+        """Timeouts and memory ceilings can only be enforced in a worker process"""
+        return self.timeout is not None or self.max_memory_mb is not None
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> 'Budget':
+        """Read DEVTOOLS_<prefix>_MAX_PAGES, _MAX_INPUT_BYTES, _TIMEOUT and _MAX_MEMORY_MB; 0 lifts a limit"""
+        values = {}
+        for field in cls._fields:
+            raw = os.environ.get(f'DEVTOOLS_{prefix}_{field.upper()}')
+            value = defaults.get(field) if raw is None else float(raw)
+            if not value:
+                values[field] = None
+            else:
+                values[field] = value if field == 'timeout' else int(value)
+        return cls(**values)
+
 
 class BaseTool(ABC):
+    # Deterministic tools return the same result for the same params and
+    # have no side effects, so the API may cache their responses
+    deterministic: bool = False
+    # Number of instances the registry keeps; 1 means a single shared
+    # instance, more means each execution borrows one from a pool
+    pool_size: int = 1
+    # Limits enforced by app.utils.resources.run_metered
+    budget: Budget = Budget()
+    # Params holding paths of input files, counted as bytes in by their size
+    file_params: Tuple[str, ...] = ()
+
     def __init__(self):
         self.name: str = self.__class__.__name__
         self.description: str = self.__doc__ or "No description available"
 
+    def setup(self) -> None:
+        """Acquire long-lived resources; called once before the instance serves requests"""
+        pass
+
+    def teardown(self) -> None:
+        """Release resources acquired in setup"""
+        pass
+
+    def health_check(self) -> bool:
+        """Return False when the instance can no longer serve requests"""
+        return True
+
+    def setup_worker(self) -> None:
+        """Set up the instance that runs isolated executions inside a worker process"""
+        self.setup()
+
+    def count_pages(self, params: Dict[str, Any]) -> Optional[int]:
+        """Return how many pages params would process, for Budget.max_pages; None if not paged"""
+        return None
+
     @abstractmethod
     def execute(self, params: Dict[str, Any] = None) -> ToolResult:
         """Execute the tool with given parameters"""
@@ -1,15 +1,40 @@
 import json
 import streamlit as st
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
+from ..base import BaseTool, ToolResult
 
 
-class ClassGenerator:
+class ClassGenerator(BaseTool):
+    """将JSON对象转换为Java/Python实体类"""
+
+    deterministic = True
+
     def get_name(self):
         return "class_generator"
     
     def get_description(self):
         return "将JSON对象转换为Java/Python实体类"
     
+    def execute(self, params: Dict[str, Any] = None) -> ToolResult:
+        if not params or 'json_input' not in params:
+            return ToolResult(success=False, message="缺少JSON输入", data=None)
+        try:
+            code = self.process(
+                params['json_input'],
+                language=params.get('language', 'Java'),
+                class_name=params.get('class_name', 'MyClass')
+            )
+            return ToolResult(success=True, data=code)
+        except ValueError as e:
+            return ToolResult(success=False, message=str(e), data=None)
+
+    def process(self, json_input: str, language: str = "Java", class_name: str = "MyClass") -> str:
+        data = self._parse_json(json_input)
+        properties = self._get_properties(data)
+        if language == "Java":
+            return self._generate_java_class(class_name, properties)
+        return self._generate_python_class(class_name, properties)
+
     def _generate_java_class(self, class_name: str, properties: Dict) -> str:
         class_code = f"public class {class_name} {{\n"
         for prop, prop_type in properties.items():
@@ -78,12 +103,7 @@ class ClassGenerator:
         
         if st.button("生成代码"):
             try:
-                data = self._parse_json(json_input)
-                properties = self._get_properties(data)
-                if language == "Java":
-                    code = self._generate_java_class(class_name, properties)
-                else:
-                    code = self._generate_python_class(class_name, properties)
+                code = self.process(json_input, language, class_name)
                 st.code(code, language=language.lower())
             except ValueError as e:
                 st.error(f"错误: {str(e)}")
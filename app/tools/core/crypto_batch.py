@@ -0,0 +1,214 @@
+# 文件：app/tools/core/crypto_batch.py
+import base64
+import binascii
+import functools
+import itertools
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256, SHA384, SHA512
+from Crypto.PublicKey import ECC, RSA
+from Crypto.Signature import DSS, eddsa, pkcs1_15, pss
+
+from app.utils.workers import shutdown_pool as shutdown_workers, worker_pool
+
+logger = logging.getLogger('crypto_batch')
+
+SIGNATURE_ALGORITHMS = ('RSA-PSS', 'RSA-PKCS1v15', 'ECDSA', 'Ed25519')
+HASHES = {'SHA256': SHA256, 'SHA384': SHA384, 'SHA512': SHA512}
+
+
+def _usable_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# 少于此数量的批次在当前线程处理，进程间通信的开销大于并行收益
+MIN_PARALLEL_ITEMS = int(os.environ.get('DEVTOOLS_CRYPTO_MIN_PARALLEL', '256'))
+# 每个服务进程各有一个进程池，按服务进程数（DEVTOOLS_WORKERS）平分CPU，避免 N×N 个进程
+WORKERS = int(os.environ.get('DEVTOOLS_CRYPTO_WORKERS', '0')) or max(
+    1, _usable_cpus() // max(1, int(os.environ.get('DEVTOOLS_WORKERS', '1'))))
+
+
+class KeySpec(NamedTuple):
+    algorithm: str
+    mode: str
+    key: str
+    hash_name: str = 'SHA256'
+
+
+class BatchWorker:
+    """用一个密钥执行一种操作，逐条返回带状态（ok/invalid/error）的结果"""
+
+    def __init__(self, spec: KeySpec):
+        self.spec = spec
+        if spec.algorithm == 'AES':
+            if spec.mode not in ('encrypt', 'decrypt'):
+                raise ValueError(f"AES不支持操作：{spec.mode}")
+            self._aes_key = spec.key.encode()
+            AES.new(self._aes_key, AES.MODE_GCM)  # 提前校验密钥长度
+        elif spec.algorithm in SIGNATURE_ALGORITHMS:
+            if spec.mode not in ('sign', 'verify'):
+                raise ValueError(f"{spec.algorithm}不支持操作：{spec.mode}")
+            if spec.hash_name not in HASHES:
+                raise ValueError(f"不支持的哈希算法：{spec.hash_name}")
+            self._scheme = self._load_scheme(spec)
+        else:
+            raise ValueError(f"不支持批量处理的算法：{spec.algorithm}")
+
+    def _load_scheme(self, spec: KeySpec):
+        if not spec.key:
+            raise ValueError("缺少密钥")
+        if spec.algorithm.startswith('RSA'):
+            key = RSA.import_key(spec.key)
+        else:
+            key = ECC.import_key(spec.key)
+            is_ed25519 = key.curve.lower() == 'ed25519'
+            if is_ed25519 != (spec.algorithm == 'Ed25519'):
+                raise ValueError(f"{spec.algorithm}的密钥类型不匹配：{key.curve}")
+
+        if spec.mode == 'sign' and not key.has_private():
+            raise ValueError("签名需要私钥")
+        if spec.mode == 'verify' and key.has_private():
+            key = key.public_key()
+
+        if spec.algorithm == 'RSA-PSS':
+            return pss.new(key)
+        if spec.algorithm == 'RSA-PKCS1v15':
+            return pkcs1_15.new(key)
+        if spec.algorithm == 'ECDSA':
+            return DSS.new(key, 'fips-186-3')
+        return eddsa.new(key, 'rfc8032')
+
+    def run(self, items: Sequence[Any]) -> List[Dict[str, Any]]:
+        return [self._run_one(item) for item in items]
+
+    def _run_one(self, item: Any) -> Dict[str, Any]:
+        try:
+            if self.spec.algorithm == 'AES':
+                return self._aes(item)
+            return self._signature(item)
+        except (ValueError, TypeError, KeyError, binascii.Error) as e:
+            return {'status': 'error', 'error': str(e) or type(e).__name__}
+
+    def _digest(self, message: bytes):
+        # Ed25519 (PureEdDSA) 直接签名原文
+        if self.spec.algorithm == 'Ed25519':
+            return message
+        return HASHES[self.spec.hash_name].new(message)
+
+    def _signature(self, item: Any) -> Dict[str, Any]:
+        if self.spec.mode == 'sign':
+            signature = self._scheme.sign(self._digest(_to_bytes(item)))
+            return {'status': 'ok', 'signature': base64.b64encode(signature).decode()}
+
+        digest = self._digest(_to_bytes(item['message']))
+        signature = base64.b64decode(item['signature'])
+        try:
+            self._scheme.verify(digest, signature)
+        except ValueError:
+            return {'status': 'invalid', 'valid': False}
+        return {'status': 'ok', 'valid': True}
+
+    def _aes(self, item: Any) -> Dict[str, Any]:
+        if self.spec.mode == 'encrypt':
+            cipher = AES.new(self._aes_key, AES.MODE_GCM)
+            ciphertext, tag = cipher.encrypt_and_digest(_to_bytes(item))
+            return {
+                'status': 'ok',
+                'ciphertext': base64.b64encode(ciphertext).decode(),
+                'tag': base64.b64encode(tag).decode(),
+                'nonce': base64.b64encode(cipher.nonce).decode(),
+            }
+
+        cipher = AES.new(self._aes_key, AES.MODE_GCM, nonce=base64.b64decode(item['nonce']))
+        ciphertext = base64.b64decode(item['ciphertext'])
+        tag = base64.b64decode(item['tag'])
+        try:
+            plaintext = cipher.decrypt_and_verify(ciphertext, tag)
+        except ValueError:
+            return {'status': 'invalid', 'error': "MAC校验失败"}
+        return {'status': 'ok', 'plaintext': plaintext.decode()}
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if not isinstance(value, str):
+        raise TypeError(f"输入必须是字符串，实际为{type(value).__name__}")
+    return value.encode()
+
+
+@functools.lru_cache(maxsize=8)
+def _worker_for(spec: KeySpec) -> BatchWorker:
+    """在工作进程中调用：每个密钥在每个进程只解析一次，之后的分块都复用"""
+    return BatchWorker(spec)
+
+
+def _warm_up() -> None:
+    # 在第一个分块到达前加载 pycryptodome 的本地模块
+    BatchWorker(KeySpec('AES', 'encrypt', '0' * 16)).run([''])
+
+
+def _process_chunk(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """在工作进程中处理一个分块"""
+    return _worker_for(KeySpec(*params['spec'])).run(params['items'])
+
+
+def _chunk_workers():
+    return worker_pool(_process_chunk, WORKERS, _warm_up)
+
+
+_dispatch: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_dispatch() -> ThreadPoolExecutor:
+    """分发线程：每个线程一次把一个分块交给一个工作进程"""
+    global _dispatch
+    with _pool_lock:
+        if _dispatch is None:
+            # 工作进程是全新的解释器，而不是从当前（多线程的）进程fork出来的
+            _chunk_workers().start()
+            _dispatch = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='crypto-batch')
+            logger.info("加密进程池已启动，共 %s 个进程", WORKERS)
+        return _dispatch
+
+
+def shutdown_pool() -> None:
+    global _dispatch
+    with _pool_lock:
+        dispatch, _dispatch = _dispatch, None
+    if dispatch is not None:
+        dispatch.shutdown(cancel_futures=True)
+        shutdown_workers(_process_chunk)
+
+
+def _run_chunk(spec: KeySpec, items: Sequence[Any]) -> List[Dict[str, Any]]:
+    outcome = _chunk_workers().run({'spec': tuple(spec), 'items': list(items)}, None, None, None)
+    if outcome.error is not None or outcome.exceeded is not None:
+        raise RuntimeError(outcome.error or "加密工作进程异常退出")
+    return outcome.result
+
+
+def run_batch(spec: KeySpec, items: Sequence[Any], chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """按输入顺序处理items，批次足够大时把分块分发到多个进程"""
+    if chunk_size is not None and (not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size <= 0):
+        raise ValueError(f"chunk_size必须是正整数，实际为{chunk_size!r}")
+    # 先在这里加载密钥，密钥无效时整个批次失败，而不是每一条都报错
+    worker = BatchWorker(spec)
+    if len(items) < MIN_PARALLEL_ITEMS or WORKERS == 1:
+        return worker.run(items)
+
+    chunk_size = chunk_size or max(16, math.ceil(len(items) / (WORKERS * 4)))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results: List[Dict[str, Any]] = []
+    for chunk_results in _get_dispatch().map(_run_chunk, itertools.repeat(spec), chunks):
+        results.extend(chunk_results)
+    return results
@@ -1,10 +1,20 @@
 # 文件：app/tools/core/crypto_tools.py
 from Crypto.Cipher import AES, DES3
 import base64
+import json
 import rsa
 import streamlit as st
+from typing import Any, Dict, List
+from ..base import BaseTool, ToolResult
+from .crypto_batch import SIGNATURE_ALGORITHMS, BatchWorker, KeySpec, run_batch, shutdown_pool
 
-class CryptoTool:
+class CryptoTool(BaseTool):
+    """AES/RSA/DES3/Base64加解密及RSA/ECDSA/Ed25519签名验签工具"""
+
+    # 输入中包含密钥，且加密结果带随机nonce，结果绝不能缓存
+    deterministic = False
+
+    DEFAULT_KEY = "4133439984133439"
 
     def get_name(self):
         return "crypto_tool"
@@ -12,9 +22,38 @@ class CryptoTool:
     def get_description(self):
         return "AES/RSA/DES3/Base64加解密工具"
     
-    def process(self, input_data: str, algorithm: str, mode: str, key: str = None) -> dict:
+    def execute(self, params: Dict[str, Any] = None) -> ToolResult:
+        if not params or 'input_data' not in params or 'algorithm' not in params:
+            return ToolResult(success=False, message="缺少参数", data=None)
+        # input_data为列表时批量处理，逐条返回状态
+        if isinstance(params['input_data'], list):
+            result = self.process_batch(
+                params['input_data'],
+                algorithm=params['algorithm'],
+                mode=params.get('mode', 'encrypt'),
+                key=params.get('key'),
+                hash_name=params.get('hash', 'SHA256'),
+                chunk_size=params.get('chunk_size')
+            )
+        else:
+            result = self.process(
+                params['input_data'],
+                algorithm=params['algorithm'],
+                mode=params.get('mode', 'encrypt'),
+                key=params.get('key'),
+                hash_name=params.get('hash', 'SHA256')
+            )
+        success = result.get("success", True)
+        return ToolResult(success=success, data=result, message=None if success else result.get("error"))
+
+    def teardown(self) -> None:
+        shutdown_pool()
+
+    def process(self, input_data: str, algorithm: str, mode: str, key: str = None, hash_name: str = 'SHA256') -> dict:
         try:
-            if algorithm == "AES":
+            if algorithm in SIGNATURE_ALGORITHMS:
+                return self._handle_signature(input_data, algorithm, mode, key, hash_name)
+            elif algorithm == "AES":
                 return self._handle_aes(input_data, mode, key)
             elif algorithm == "RSA":
                 return self._handle_rsa(input_data, mode, key)
@@ -31,11 +70,35 @@ class CryptoTool:
                 "suggestion": self._get_error_suggestion(e)
             }
 
+    def process_batch(self, items: List[Any], algorithm: str, mode: str, key: str = None,
+                      hash_name: str = 'SHA256', chunk_size: int = None) -> dict:
+        """批量签名/验签或AES加解密，大批次分块分发到多个进程，结果保持输入顺序"""
+        if algorithm == "AES" and not key:
+            key = self.DEFAULT_KEY
+        try:
+            results = run_batch(KeySpec(algorithm, mode, key, hash_name), items, chunk_size)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "suggestion": self._get_error_suggestion(e)
+            }
+        counts = {"ok": 0, "invalid": 0, "error": 0}
+        for item in results:
+            counts[item["status"]] += 1
+        return {"results": results, **counts}
+
+    def _handle_signature(self, data, algorithm: str, mode: str, key: str, hash_name: str):
+        result = BatchWorker(KeySpec(algorithm, mode, key, hash_name)).run([data])[0]
+        if result.pop("status") == "error":
+            raise ValueError(result["error"])
+        return result
+
     def _handle_aes(self, data: str, mode: str, key: str):
         if not key:
-            key = "4133439984133439"
-        cipher = AES.new(key.encode(), AES.MODE_GCM)
+            key = self.DEFAULT_KEY
         if mode == "encrypt":
+            cipher = AES.new(key.encode(), AES.MODE_GCM)
             ciphertext, tag = cipher.encrypt_and_digest(data.encode())
             return {
                 "ciphertext": base64.b64encode(ciphertext).decode(),
@@ -43,6 +106,8 @@ class CryptoTool:
                 "nonce": base64.b64encode(cipher.nonce).decode()
             }
         else:
+            # 解密必须使用加密时生成的nonce
+            cipher = AES.new(key.encode(), AES.MODE_GCM, nonce=base64.b64decode(data["nonce"]))
             decrypted = cipher.decrypt_and_verify(
                 base64.b64decode(data["ciphertext"]),
                 base64.b64decode(data["tag"])
@@ -61,7 +126,7 @@ class CryptoTool:
 
     def _handle_des3(self, data: str, mode: str, key: str):
         if not key:
-            key = "4133439984133439"
+            key = self.DEFAULT_KEY
         cipher = DES3.new(key.encode(), DES3.MODE_EAX)
         if mode == "encrypt":
             ciphertext, tag = cipher.encrypt_and_digest(data.encode())
@@ -107,27 +172,54 @@ class CryptoTool:
 
     def render_ui(self):
         st.header("🔐 加解密工具")
-        algo = st.selectbox("算法选择", ["AES", "RSA", "DES3", "Base64"])
-        mode = st.radio("操作模式", ["encrypt", "decrypt"])
+        algo = st.selectbox("算法选择", ["AES", "RSA", "DES3", "Base64", *SIGNATURE_ALGORITHMS])
+        signing = algo in SIGNATURE_ALGORITHMS
+        mode = st.radio("操作模式", ["sign", "verify"] if signing else ["encrypt", "decrypt"])
+        batch = False
+        if signing or algo == "AES":
+            batch = st.checkbox("批量处理", help="每行一条输入；验签和解密时每行为一个JSON对象")
         
         input_data = st.text_area("输入内容", height=150)
         key = None
+        hash_name = "SHA256"
         
         if algo in ["AES", "RSA", "DES3"]:
             key = st.text_input(f"{algo}密钥", 
                               help="AES: 16/24/32字节, RSA: PKCS#1格式, DES3: 24字节")
+        elif signing:
+            key = st.text_area(f"{algo}密钥（PEM）", height=120,
+                               help="签名需要私钥，验签可使用公钥或私钥")
+            if algo != "Ed25519":
+                hash_name = st.selectbox("哈希算法", ["SHA256", "SHA384", "SHA512"])
         
         if st.button("执行操作"):
-            result = self.process(
-                input_data=input_data,
-                algorithm=algo,
-                mode=mode.lower(),
-                key=key
-            )
+            try:
+                data = self._parse_ui_input(input_data, mode, batch)
+            except json.JSONDecodeError as e:
+                st.error(f"输入不是有效的JSON：{e}")
+                return
+            if batch:
+                result = self.process_batch(data, algorithm=algo, mode=mode, key=key, hash_name=hash_name)
+            else:
+                result = self.process(
+                    input_data=data,
+                    algorithm=algo,
+                    mode=mode.lower(),
+                    key=key,
+                    hash_name=hash_name
+                )
             
             if result.get("success", True):
                 st.success("操作成功！")
                 st.json(result)
             else:
                 st.error(f"操作失败：{result['error']}")
-                st.warning(f"建议：{result['suggestion']}")
\ No newline at end of file
+                st.warning(f"建议：{result['suggestion']}")
+
+    def _parse_ui_input(self, input_data: str, mode: str, batch: bool):
+        # 验签和解密的输入是JSON对象（message/signature 或 ciphertext/tag/nonce）
+        structured = mode in ("verify", "decrypt")
+        if not batch:
+            return json.loads(input_data) if structured and input_data.lstrip().startswith("{") else input_data
+        lines = [line for line in input_data.splitlines() if line.strip()]
+        return [json.loads(line) for line in lines] if structured else lines
@@ -0,0 +1,416 @@
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import zipfile
+from itertools import chain, islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+import openpyxl
+import streamlit as st
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.exceptions import InvalidFileException
+
+from app.utils.uploads import persist_upload, resolve_input
+from ..base import BaseTool, ToolResult
+
+logger = logging.getLogger('excel_reader')
+
+# Rows are serialized and written in batches of this size
+WRITE_BATCH_ROWS = 1000
+# Workbooks on the server may be read by path only below this directory;
+# unset, only uploads (API and web UI) can be read
+EXCEL_ROOT = os.environ.get('DEVTOOLS_EXCEL_ROOT') or None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    return str(value)
+
+
+class RowWriter:
+    """Stream sheets into a binary sink one batch of rows at a time"""
+
+    format_name = ''
+    extension = ''
+    mime_type = 'application/octet-stream'
+
+    def __init__(self, sink: BinaryIO, sheet_count: int):
+        self.sink = sink
+        self.sheet_count = sheet_count
+
+    @classmethod
+    def output_type(cls, sheet_count: int) -> Tuple[str, str]:
+        """File extension and MIME type of the output"""
+        return cls.extension, cls.mime_type
+
+    def begin_sheet(self, name: str, columns: List[str], header: bool) -> None:
+        pass
+
+    def write_rows(self, rows: List[tuple]) -> None:
+        raise NotImplementedError
+
+    def end_sheet(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class CSVRowWriter(RowWriter):
+    """A plain CSV for one sheet, a ZIP with one CSV per sheet otherwise"""
+
+    format_name = 'csv'
+
+    def __init__(self, sink: BinaryIO, sheet_count: int):
+        super().__init__(sink, sheet_count)
+        self._zip = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) if sheet_count > 1 else None
+        self._text = None
+
+    @classmethod
+    def output_type(cls, sheet_count: int) -> Tuple[str, str]:
+        return ('.zip', 'application/zip') if sheet_count > 1 else ('.csv', 'text/csv')
+
+    def begin_sheet(self, name: str, columns: List[str], header: bool) -> None:
+        target = self._zip.open(name + '.csv', 'w', force_zip64=True) if self._zip else self.sink
+        self._text = io.TextIOWrapper(target, encoding='utf-8', newline='', write_through=False)
+        self._csv = csv.writer(self._text)
+        if header:
+            self._csv.writerow(columns)
+
+    def write_rows(self, rows: List[tuple]) -> None:
+        self._csv.writerows(rows)
+
+    def end_sheet(self) -> None:
+        if self._zip:
+            # Closing the wrapper flushes it and closes the archive member
+            self._text.close()
+        else:
+            self._text.flush()
+            self._text.detach()
+        self._text = None
+
+    def close(self) -> None:
+        if self._zip:
+            self._zip.close()
+
+
+class NDJSONRowWriter(RowWriter):
+    """One JSON object per row, tagged with its sheet in `_table` like the PDF tool's NDJSON output"""
+
+    format_name = 'ndjson'
+    extension = '.ndjson'
+    mime_type = 'application/x-ndjson'
+
+    def begin_sheet(self, name: str, columns: List[str], header: bool) -> None:
+        self._columns = columns
+        self._name = name
+
+    def write_rows(self, rows: List[tuple]) -> None:
+        columns, name = self._columns, self._name
+        lines = [
+            json.dumps({**dict(zip(columns, row)), '_table': name}, ensure_ascii=False, default=_json_default)
+            for row in rows
+        ]
+        self.sink.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+
+class JSONRowWriter(RowWriter):
+    """A single object mapping each sheet name to its array of row objects"""
+
+    format_name = 'json'
+    extension = '.json'
+    mime_type = 'application/json'
+
+    def __init__(self, sink: BinaryIO, sheet_count: int):
+        super().__init__(sink, sheet_count)
+        self._separator = b'{'
+
+    def begin_sheet(self, name: str, columns: List[str], header: bool) -> None:
+        self._columns = columns
+        self.sink.write(self._separator + json.dumps(name, ensure_ascii=False).encode('utf-8') + b':[')
+        self._separator = b','
+        self._first_row = True
+
+    def write_rows(self, rows: List[tuple]) -> None:
+        columns = self._columns
+        text = ','.join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) for row in rows
+        )
+        if not self._first_row:
+            text = ',' + text
+        self._first_row = False
+        self.sink.write(text.encode('utf-8'))
+
+    def end_sheet(self) -> None:
+        self.sink.write(b']')
+
+    def close(self) -> None:
+        self.sink.write(b'{}' if self._separator == b'{' else b'}')
+
+
+ROW_WRITERS: Dict[str, Type[RowWriter]] = {
+    writer.format_name: writer for writer in (CSVRowWriter, NDJSONRowWriter, JSONRowWriter)
+}
+
+
+class ExcelReaderTool(BaseTool):
+    """Convert Excel sheets to CSV, NDJSON or JSON, streaming rows so memory stays flat"""
+
+    file_params = ('excel_file',)
+
+    def execute(self, params: Dict[str, Any] = None, output_file: Optional[str] = None) -> ToolResult:
+        """Convert params['excel_file']. The result is written to output_file when one is given, which only
+        the server chooses: it is never read from params, since those come from clients."""
+        if not params or 'excel_file' not in params:
+            return ToolResult(success=False, message="Missing Excel file", data=None)
+        error = self._check_params(params)
+        if error:
+            return ToolResult(success=False, message=error, data=None)
+        output_format = params.get('output_format', 'csv')
+        try:
+            excel_file = resolve_input(params['excel_file'], 'excel', EXCEL_ROOT)
+        except PermissionError as e:
+            return ToolResult(success=False, message=str(e), data=None)
+
+        # Write into output_file when given so large results never sit in memory
+        output = open(output_file, 'wb') if output_file else io.BytesIO()
+        try:
+            sheets = self.convert(
+                excel_file,
+                output,
+                output_format=output_format,
+                sheets=params.get('sheets'),
+                cell_range=params.get('range'),
+                header=params.get('header', 'auto'),
+                skip_empty=params.get('skip_empty', True)
+            )
+        except (ValueError, KeyError, zipfile.BadZipFile, InvalidFileException, OSError) as e:
+            logger.warning("Could not read %s: %s", excel_file, e)
+            output.close()
+            return ToolResult(success=False, message=f"Error reading Excel file: {e}", data=None)
+        except BaseException:
+            output.close()
+            raise
+
+        rows = sum(sheet['rows'] for sheet in sheets)
+        if output_file:
+            output.close()
+        else:
+            output.seek(0)
+        return ToolResult(
+            success=True,
+            data=output_file or output,
+            message=f"Converted {rows} rows from {len(sheets)} sheet(s) to {output_format.upper()}",
+            metadata={'sheets': sheets}
+        )
+
+    def _check_params(self, params: Dict[str, Any]) -> Optional[str]:
+        """Describe the first param of the wrong type or value; params come from clients as JSON"""
+        output_format = params.get('output_format', 'csv')
+        if not isinstance(output_format, str) or output_format not in ROW_WRITERS:
+            return f"Unsupported output format: {output_format}"
+        sheets = params.get('sheets')
+        items = sheets if isinstance(sheets, list) else [] if sheets is None else [sheets]
+        if not all(isinstance(item, (str, int)) and not isinstance(item, bool) for item in items):
+            return "sheets must be a sheet name, a sheet number or a list of them"
+        if params.get('range') is not None and not isinstance(params['range'], str):
+            return "range must be a string such as 'B2:F100'"
+        header = params.get('header', 'auto')
+        if header != 'auto' and not isinstance(header, bool):
+            return "header must be 'auto', true or false"
+        if not isinstance(params.get('skip_empty', True), bool):
+            return "skip_empty must be true or false"
+        return None
+
+    def convert(self, excel_file, sink: BinaryIO, output_format: str = 'csv', sheets=None,
+                cell_range: Optional[str] = None, header='auto', skip_empty: bool = True) -> List[Dict[str, Any]]:
+        """Stream the selected sheets into sink and return per-sheet row counts"""
+        bounds = self._parse_range(cell_range)
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+        try:
+            # Chart sheets have no cells
+            names = self._select_sheets([ws.title for ws in workbook.worksheets], sheets)
+            writer = ROW_WRITERS[output_format](sink, len(names))
+            report = []
+            for name in names:
+                rows = self._iter_rows(workbook[name], bounds, skip_empty)
+                report.append(self._write_sheet(writer, name, rows, bounds[0], header))
+            writer.close()
+            return report
+        finally:
+            # Read-only workbooks keep the file open until closed
+            workbook.close()
+
+    def _write_sheet(self, writer: RowWriter, name: str, rows: Iterator[tuple], first_column: int,
+                     header) -> Dict[str, Any]:
+        first = next(rows, None)
+        has_header = first is not None and (header is True or (header == 'auto' and self._looks_like_header(first)))
+        if has_header:
+            columns = self._header_names(first, first_column)
+        else:
+            width = len(first) if first is not None else 0
+            columns = [get_column_letter(first_column + i) for i in range(width)]
+            if first is not None:
+                rows = chain([first], rows)
+
+        writer.begin_sheet(name, columns, has_header)
+        count = 0
+        while batch := list(islice(rows, WRITE_BATCH_ROWS)):
+            writer.write_rows(batch)
+            count += len(batch)
+        writer.end_sheet()
+        logger.debug("Wrote %s rows of sheet %s", count, name)
+        return {'name': name, 'rows': count, 'header': has_header, 'columns': columns}
+
+    def _iter_rows(self, worksheet, bounds: Tuple[int, Optional[int], Optional[int], Optional[int]],
+                   skip_empty: bool) -> Iterator[tuple]:
+        min_col, min_row, max_col, max_row = bounds
+        rows = worksheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col,
+                                   values_only=True)
+        for row in rows:
+            if skip_empty and all(value is None for value in row):
+                continue
+            yield row
+
+    def _parse_range(self, cell_range: Optional[str]) -> Tuple[int, Optional[int], Optional[int], Optional[int]]:
+        """Turn 'B2:F100', 'A:D' or '5:20' into (min_col, min_row, max_col, max_row); open ends are None"""
+        if not cell_range:
+            return 1, 1, None, None
+        try:
+            min_col, min_row, max_col, max_row = range_boundaries(cell_range.upper())
+        except (ValueError, TypeError):
+            raise ValueError(f"Invalid range: {cell_range}")
+        return min_col or 1, min_row or 1, max_col, max_row
+
+    def _select_sheets(self, sheet_names: List[str], sheets) -> List[str]:
+        if sheets in (None, '', 'all'):
+            return list(sheet_names)
+        if isinstance(sheets, (str, int)):
+            sheets = [sheets]
+        selected = []
+        for sheet in sheets:
+            if isinstance(sheet, int) or (isinstance(sheet, str) and sheet.isdigit() and sheet not in sheet_names):
+                index = int(sheet)
+                if not 0 <= index < len(sheet_names):
+                    raise ValueError(f"No sheet number {index}, the workbook has {len(sheet_names)}")
+                selected.append(sheet_names[index])
+            elif sheet in sheet_names:
+                selected.append(sheet)
+            else:
+                raise ValueError(f"No sheet named {sheet!r}")
+        return selected
+
+    def _looks_like_header(self, row: Sequence) -> bool:
+        """A header row holds text labels in at least half of its cells and nothing else"""
+        labels = [value for value in row if value is not None]
+        if not labels or len(labels) * 2 < len(row):
+            return False
+        return all(isinstance(value, str) and value.strip() for value in labels)
+
+    def _header_names(self, row: Sequence, first_column: int) -> List[str]:
+        """Header labels, falling back to column letters for blank cells and suffixing duplicates"""
+        names, seen = [], {}
+        for i, value in enumerate(row):
+            name = str(value).strip() if value is not None and str(value).strip() else get_column_letter(first_column + i)
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}_{seen[name]}"
+            else:
+                seen[name] = 0
+            names.append(name)
+        return names
+
+    def render_ui(self) -> None:
+        st.write("## Excel Reader")
+        st.write("Convert Excel sheets to CSV, NDJSON or JSON without loading the workbook into memory")
+
+        uploaded_file = st.file_uploader("Upload Excel", type=["xlsx", "xlsm"])
+
+        col1, col2 = st.columns(2)
+        with col1:
+            output_format = st.selectbox(
+                "Output Format",
+                list(ROW_WRITERS),
+                help="csv: one CSV (a ZIP with one CSV per sheet when several are selected). ndjson: one JSON object per row. json: sheet name to array of rows."
+            )
+            header = st.selectbox(
+                "Header Row",
+                ["auto", "yes", "no"],
+                help="auto: use the first row as column names when it only holds text labels"
+            )
+        with col2:
+            cell_range = st.text_input("Range", value="", help="e.g. 'B2:F100', 'A:D' or '5:20'; empty reads everything")
+            skip_empty = st.checkbox("Skip Empty Rows", value=True)
+
+        if uploaded_file is None:
+            st.session_state.pop('excel_upload', None)
+            return
+
+        digest, excel_path = self._session_upload(uploaded_file)
+        try:
+            workbook = openpyxl.load_workbook(excel_path, read_only=True)
+            sheet_names = [ws.title for ws in workbook.worksheets]
+            workbook.close()
+        except (ValueError, zipfile.BadZipFile, InvalidFileException, OSError) as e:
+            st.error(f"Error reading Excel file: {e}")
+            return
+        sheets = st.multiselect("Sheets", sheet_names, default=sheet_names)
+        options = (output_format, tuple(sheets), cell_range, header, skip_empty)
+
+        if st.button("Convert"):
+            with st.spinner("Reading workbook..."):
+                result = self.execute({
+                    "excel_file": excel_path,
+                    "output_format": output_format,
+                    "sheets": sheets,
+                    "range": cell_range,
+                    "header": {"auto": "auto", "yes": True, "no": False}[header],
+                    "skip_empty": skip_empty,
+                })
+            if result.success:
+                st.session_state['excel_result'] = {
+                    'digest': digest, 'options': options, 'message': result.message,
+                    'sheets': result.metadata['sheets'], 'data': result.data.getvalue(),
+                }
+            else:
+                st.session_state.pop('excel_result', None)
+                st.error(result.message)
+
+        # Keep showing the last result of this upload, so downloading it or
+        # touching a widget does not convert again
+        result = st.session_state.get('excel_result')
+        if not result or result['digest'] != digest:
+            return
+        if result['options'] != options:
+            st.info("Options changed since this result was converted. Press Convert to apply them.")
+        st.success(result['message'])
+        st.dataframe([{k: v for k, v in sheet.items() if k != 'columns'} for sheet in result['sheets']])
+        result_format = result['options'][0]
+        extension, mime_type = ROW_WRITERS[result_format].output_type(len(result['sheets']))
+        st.download_button(
+            label=f"Download {result_format.upper()} File",
+            data=result['data'],
+            file_name=os.path.splitext(uploaded_file.name)[0] + extension,
+            mime=mime_type
+        )
+
+    def _session_upload(self, uploaded_file) -> Tuple[str, str]:
+        """Write an upload to disk once per session; returns its SHA-256 and path.
+
+        The file is stored by content hash and shared by every session that
+        uploads the same workbook; persist_upload deletes it once it goes unused.
+        """
+        saved = st.session_state.get('excel_upload')
+        if saved and saved['file_id'] == uploaded_file.file_id and os.path.exists(saved['path']):
+            return saved['digest'], saved['path']
+
+        digest, path = persist_upload(uploaded_file.getvalue(), 'excel', '.xlsx')
+        st.session_state['excel_upload'] = {'file_id': uploaded_file.file_id, 'digest': digest, 'path': path}
+        return digest, path
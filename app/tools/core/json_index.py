@@ -0,0 +1,418 @@
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger('json_index')
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = '.idx.json'
+# Saved indexes live here, never next to the indexed file: queried paths
+# come from clients, and their directories are not ours to write to
+INDEX_DIR = os.environ.get('DEVTOOLS_JSON_INDEX_DIR') or os.path.join(tempfile.gettempdir(), 'devtools-json-index')
+# Saved indexes unused for this many seconds are deleted
+INDEX_MAX_AGE = int(os.environ.get('DEVTOOLS_JSON_INDEX_MAX_AGE', str(7 * 24 * 3600)))
+# Containers this deep or deeper are recorded as a plain (start, end) span
+DEFAULT_DEPTH = 1
+# Spans at least this large are indexed on first use instead of parsed whole
+LAZY_INDEX_MIN_BYTES = 1024 * 1024
+# Open indexes (and their memory maps) kept per process
+MAX_OPEN_INDEXES = 8
+
+# Whole strings, so that brackets inside them are skipped, and structural
+# characters; numbers, literals and whitespace never produce a token
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],:]')
+_NON_SPACE = re.compile(rb'\S')
+# The next bracket outside strings, in one match
+_BRACKET = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+
+_QUOTE, _COLON, _COMMA = ord('"'), ord(':'), ord(',')
+_OPEN_OBJECT, _CLOSE_OBJECT = ord('{'), ord('}')
+_OPEN_ARRAY, _CLOSE_ARRAY = ord('['), ord(']')
+
+# An index node is {"o": [start, end], "k": {key: child}} for objects or
+# {"a": [start, end], "i": [child, ...]} for arrays; a child is a node or a
+# [start, end] span of the value's bytes
+Node = Dict[str, Any]
+Child = Union[Node, List[int]]
+
+
+class _Frame:
+    __slots__ = ('is_object', 'start', 'children', 'value_start', 'key', 'expecting_key', 'pending')
+
+    def __init__(self, is_object: bool, start: int):
+        self.is_object = is_object
+        self.start = start
+        self.children = {} if is_object else []
+        self.value_start = None if is_object else start + 1
+        self.key = None
+        self.expecting_key = is_object
+        self.pending: Optional[Node] = None
+
+    def finish_child(self, end: int) -> None:
+        child = self.pending if self.pending is not None else [self.value_start, end]
+        self.pending = None
+        if self.is_object:
+            self.children[self.key] = child
+        else:
+            self.children.append(child)
+
+
+def _skip_container(buf, start: int, end: int) -> int:
+    """Return the offset just past the container opening at start, looking only at brackets"""
+    depth = 0
+    pos = start
+    # Anchored matches: a search would rescan the rest of a malformed document from every offset
+    while (match := _BRACKET.match(buf, pos, end)) is not None:
+        pos = match.end()
+        if buf[match.start(1)] in (_OPEN_OBJECT, _OPEN_ARRAY):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+    raise ValueError("Document ends inside an unclosed container")
+
+
+def build_index(buf, max_depth: int = DEFAULT_DEPTH, start: int = 0, end: Optional[int] = None) -> Child:
+    """Scan a JSON document (or the value between start and end) once and
+    return the offsets of its containers down to max_depth"""
+    end = len(buf) if end is None else end
+    stack: List[_Frame] = []
+    root: Optional[Child] = None
+    pos = start
+
+    while True:
+        match = _TOKEN.search(buf, pos, end)
+        if match is None:
+            break
+        at, pos = match.start(), match.end()
+        char = buf[at]
+        frame = stack[-1] if stack else None
+
+        if char == _QUOTE:
+            if frame is not None and frame.expecting_key:
+                frame.key = json.loads(match.group())
+                frame.expecting_key = False
+        elif char == _COLON:
+            if frame is not None:
+                frame.value_start = pos
+        elif char == _COMMA:
+            if frame is not None:
+                frame.finish_child(at)
+                if frame.is_object:
+                    frame.expecting_key = True
+                else:
+                    frame.value_start = pos
+        elif char in (_OPEN_OBJECT, _OPEN_ARRAY):
+            if len(stack) < max_depth:
+                stack.append(_Frame(char == _OPEN_OBJECT, at))
+                continue
+            # Too deep to record: jump to its end, the parent keeps it as a span
+            pos = _skip_container(buf, at, end)
+            if frame is None and root is None:
+                root = [at, pos]
+        else:
+            if frame is None or frame.is_object != (char == _CLOSE_OBJECT):
+                raise ValueError(f"Unbalanced {chr(char)} at byte {at}")
+            stack.pop()
+            if frame.is_object:
+                has_last = not frame.expecting_key
+            else:
+                has_last = _NON_SPACE.search(buf, frame.value_start, at) is not None
+            if has_last:
+                frame.finish_child(at)
+            node = {'o' if frame.is_object else 'a': [frame.start, pos],
+                    'k' if frame.is_object else 'i': frame.children}
+            if stack:
+                stack[-1].pending = node
+            elif root is None:
+                root = node
+
+    if stack:
+        raise ValueError("Document ends inside an unclosed container")
+    if root is None:
+        # A bare scalar
+        first = _NON_SPACE.search(buf, start, end)
+        root = [first.start() if first else start, end]
+    return root
+
+
+class JSONIndex:
+    """A memory-mapped JSON file plus the offset index of its top-level containers.
+
+    Large values below max_depth get their own one-level index the first time
+    a query steps into them; those are kept in sub_indexes by start offset.
+    """
+
+    def __init__(self, path: str, max_depth: int, stat: os.stat_result):
+        self.path = path
+        self.max_depth = max_depth
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.root: Child = [0, 0]
+        self.sub_indexes: Dict[int, Node] = {}
+        # Set when sub_indexes grew and the saved index is behind
+        self.dirty = False
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    def is_current(self, stat: os.stat_result) -> bool:
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def query(self, expression: str, limit: Optional[int] = None) -> Tuple[List[Any], bool]:
+        """Return the values selected by a JSONPath expression and whether limit cut them off"""
+        handles: Iterator[tuple] = iter([self._wrap(self.root)])
+        for step in parse_path(expression):
+            handles = self._apply(step, handles)
+        selected = list(itertools.islice(handles, limit + 1 if limit else None))
+        truncated = bool(limit) and len(selected) > limit
+        matches = [self._materialize(h) for h in selected[:limit]]
+        if self.dirty:
+            self.dirty = False
+            _save(self)
+        return matches, truncated
+
+    # A handle is ('node', node), ('span', start, end) or ('value', python_value)
+
+    def _wrap(self, child: Child) -> tuple:
+        return ('node', child) if isinstance(child, dict) else ('span', child[0], child[1])
+
+    def _materialize(self, handle: tuple) -> Any:
+        if handle[0] == 'value':
+            return handle[1]
+        start, end = (handle[1].get('o') or handle[1].get('a')) if handle[0] == 'node' else handle[1:]
+        return json.loads(self._map[start:end])
+
+    def _expand(self, span: tuple) -> Optional[tuple]:
+        """Turn a span into something to select from: its sub-index when large, else its parsed value"""
+        _, start, end = span
+        node = self.sub_indexes.get(start)
+        if node is not None:
+            return ('node', node)
+        if end - start >= LAZY_INDEX_MIN_BYTES:
+            child = build_index(self._map, 1, start, end)
+            if isinstance(child, dict):
+                self.sub_indexes[start] = child
+                self.dirty = True
+                return ('node', child)
+        value = self._materialize(span)
+        return ('value', value) if isinstance(value, (dict, list)) else None
+
+    def _apply(self, step: tuple, handles: Iterator[tuple]) -> Iterator[tuple]:
+        for handle in handles:
+            if step[0] == 'descend':
+                yield from self._descend(step[1], handle)
+            else:
+                yield from self._select(step, handle)
+
+    def _descend(self, step: tuple, handle: tuple) -> Iterator[tuple]:
+        """Apply step to handle and to every value below it, in document order"""
+        yield from self._select(step, handle)
+        for child in self._select(('wildcard',), handle):
+            yield from self._descend(step, child)
+
+    def _select(self, step: tuple, handle: tuple) -> Iterator[tuple]:
+        kind = step[0]
+        if kind == 'union':
+            for part in step[1]:
+                yield from self._select(part, handle)
+            return
+
+        if handle[0] == 'span':
+            handle = self._expand(handle)
+            if handle is None:
+                return
+
+        if handle[0] == 'node':
+            node = handle[1]
+            children = node['k'] if 'k' in node else node['i']
+            wrap = self._wrap
+        else:
+            children = handle[1]
+            wrap = lambda value: ('value', value)
+
+        if isinstance(children, dict):
+            if kind == 'wildcard':
+                yield from (wrap(child) for child in children.values())
+            elif kind == 'key' and step[1] in children:
+                yield wrap(children[step[1]])
+        elif isinstance(children, list):
+            if kind == 'wildcard':
+                yield from (wrap(child) for child in children)
+            elif kind == 'index' and -len(children) <= step[1] < len(children):
+                yield wrap(children[step[1]])
+            elif kind == 'slice':
+                yield from (wrap(child) for child in children[slice(*step[1:])])
+
+
+_PATH_STEP = re.compile(r"""
+    \.\.(?P<descend>[A-Za-z_$][\w$-]*|\*)
+  | \.(?P<name>[A-Za-z_$][\w$-]*|\*)
+  | \[(?P<bracket>(?:'[^']*'|"[^"]*"|[^\]'"])*)\]
+""", re.VERBOSE)
+_BRACKET_ITEM = re.compile(r"""\s*(?:'(?P<single>[^']*)'|"(?P<double>[^"]*)"|(?P<index>-?\d+))\s*(?:,|$)""")
+
+
+def parse_path(expression: str) -> List[tuple]:
+    """Parse a JSONPath subset: $, .name, ['name'], [n], [start:stop:step], [*], .*, ..name, unions like [0,2]"""
+    text = expression.strip()
+    if text.startswith('$'):
+        text = text[1:]
+    steps = []
+    pos = 0
+    while pos < len(text):
+        match = _PATH_STEP.match(text, pos)
+        if match is None:
+            raise ValueError(f"Cannot parse JSONPath at: {text[pos:]!r}")
+        pos = match.end()
+        if match.group('descend') is not None:
+            steps.append(('descend', _name_step(match.group('descend'))))
+        elif match.group('name') is not None:
+            steps.append(_name_step(match.group('name')))
+        else:
+            steps.append(_bracket_step(match.group('bracket').strip()))
+    return steps
+
+
+def _name_step(name: str) -> tuple:
+    return ('wildcard',) if name == '*' else ('key', name)
+
+
+def _bracket_step(content: str) -> tuple:
+    if content == '*':
+        return ('wildcard',)
+    if ':' in content and not content.startswith(("'", '"')):
+        parts = [part.strip() for part in content.split(':')]
+        if len(parts) > 3 or not all(not part or re.fullmatch(r'-?\d+', part) for part in parts):
+            raise ValueError(f"Invalid slice: [{content}]")
+        return ('slice', *[int(part) if part else None for part in parts])
+
+    items = []
+    pos = 0
+    while pos < len(content):
+        match = _BRACKET_ITEM.match(content, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"Invalid selector: [{content}]")
+        pos = match.end()
+        if match.group('index') is not None:
+            items.append(('index', int(match.group('index'))))
+        else:
+            items.append(('key', match.group('single') if match.group('single') is not None else match.group('double')))
+    if not items:
+        raise ValueError("Empty selector: []")
+    return items[0] if len(items) == 1 else ('union', items)
+
+
+_open_indexes: 'OrderedDict[Tuple[str, int], JSONIndex]' = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def open_index(path: str, max_depth: int = DEFAULT_DEPTH) -> Tuple[JSONIndex, bool]:
+    """Return the index of a JSON file (already open, saved, or built by scanning it) and whether this call scanned it"""
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    cache_key = (path, max_depth)
+    with _open_lock:
+        index = _open_indexes.get(cache_key)
+        if index is not None and index.is_current(stat):
+            _open_indexes.move_to_end(cache_key)
+            return index, False
+
+    index = JSONIndex(path, max_depth, stat)
+    built = not _load_saved(index)
+    if built:
+        index.root = build_index(index._map, max_depth)
+        _save(index)
+
+    # Evicted indexes are not closed: a running query may still use them,
+    # their memory maps are released with the last reference
+    with _open_lock:
+        _open_indexes[cache_key] = index
+        _open_indexes.move_to_end(cache_key)
+        while len(_open_indexes) > MAX_OPEN_INDEXES:
+            _open_indexes.popitem(last=False)
+    return index, built
+
+
+def _saved_path(index: JSONIndex) -> str:
+    """One saved index per file and depth; a newer version of the file overwrites it"""
+    key = hashlib.sha256(f'{index.path}\0{index.max_depth}'.encode('utf-8')).hexdigest()
+    return os.path.join(INDEX_DIR, key + INDEX_SUFFIX)
+
+
+def _load_saved(index: JSONIndex) -> bool:
+    saved_path = _saved_path(index)
+    try:
+        with open(saved_path, 'rb') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if (saved.get('version') != INDEX_VERSION or saved.get('path') != index.path or saved.get('size') != index.size
+            or saved.get('mtime_ns') != index.mtime_ns or saved.get('max_depth') != index.max_depth):
+        logger.debug("Saved index of %s is out of date", index.path)
+        return False
+    try:
+        # Mark it as used so that the sweep keeps it
+        os.utime(saved_path)
+    except OSError:
+        pass
+    index.root = saved['root']
+    index.sub_indexes = {int(start): node for start, node in saved.get('sub_indexes', {}).items()}
+    return True
+
+
+def _save(index: JSONIndex) -> None:
+    """Write the index to INDEX_DIR, atomically; failing to only costs the next process a scan"""
+    saved = {
+        'version': INDEX_VERSION,
+        'path': index.path,
+        'size': index.size,
+        'mtime_ns': index.mtime_ns,
+        'max_depth': index.max_depth,
+        'root': index.root,
+        'sub_indexes': index.sub_indexes,
+    }
+    try:
+        os.makedirs(INDEX_DIR, mode=0o700, exist_ok=True)
+        _sweep_saved()
+        fd, temp_path = tempfile.mkstemp(dir=INDEX_DIR, prefix='.', suffix=INDEX_SUFFIX)
+    except OSError as e:
+        logger.warning("Could not save the index of %s: %s", index.path, e)
+        return
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(saved, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(temp_path, _saved_path(index))
+    except (OSError, RuntimeError) as e:
+        logger.warning("Could not save the index of %s: %s", index.path, e)
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+_last_sweep = 0.0
+
+
+def _sweep_saved() -> None:
+    """Delete saved indexes nobody loaded for INDEX_MAX_AGE seconds, at most once an hour"""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < 3600:
+        return
+    _last_sweep = now
+    for entry in os.scandir(INDEX_DIR):
+        try:
+            if entry.name.endswith(INDEX_SUFFIX) and now - entry.stat().st_mtime > INDEX_MAX_AGE:
+                os.unlink(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,88 @@
+import os
+import time
+from typing import Any, Dict, Optional
+import streamlit as st
+from app.utils.uploads import persist_upload, resolve_input
+from ..base import BaseTool, ToolResult
+from .json_index import DEFAULT_DEPTH, open_index
+
+# Server-side JSON files may be queried by path only below this directory;
+# unset, only files uploaded through the web UI can be queried
+JSON_ROOT = os.environ.get('DEVTOOLS_JSON_ROOT') or None
+
+class JSONQueryTool(BaseTool):
+    """Queries large JSON files with JSONPath selectors, parsing only the parts a query touches"""
+
+    # The file may change at any time, so results cannot be cached by params
+    deterministic = False
+    file_params = ('file',)
+
+    def get_name(self):
+        return "json_query"
+
+    def get_description(self):
+        return "Queries large JSON files with JSONPath selectors, parsing only the parts a query touches"
+
+    def execute(self, params: Dict[str, Any] = None) -> ToolResult:
+        if not params or 'file' not in params or 'query' not in params:
+            return ToolResult(success=False, message="缺少文件路径或查询表达式", data=None)
+        result = self.process(
+            params['file'],
+            params['query'],
+            limit=params.get('limit'),
+            index_depth=params.get('index_depth', DEFAULT_DEPTH)
+        )
+        return ToolResult(success=result['valid'], data=result, message=result.get('message'))
+
+    def process(self, file: str, query: str, limit: Optional[int] = None, index_depth: int = DEFAULT_DEPTH) -> dict:
+        """Run query against file, which must lie under JSON_ROOT or be a web UI upload"""
+        started = time.perf_counter()
+        try:
+            path = resolve_input(file, 'json', JSON_ROOT)
+            index, built = open_index(path, max(1, int(index_depth)))
+            matches, truncated = index.query(query, int(limit) if limit else None)
+        except PermissionError:
+            return {"valid": False, "message": f"不允许读取该文件：{file}"}
+        except FileNotFoundError:
+            return {"valid": False, "message": f"文件不存在：{file}"}
+        except ValueError as e:
+            # A bad query, or the parts of the file it touched are not valid JSON
+            return {"valid": False, "message": f"查询失败：{e}"}
+        return {
+            "valid": True,
+            "matches": matches,
+            "count": len(matches),
+            "truncated": truncated,
+            "index": {
+                "built": built,
+                "seconds": round(time.perf_counter() - started, 6)
+            }
+        }
+
+    def _persist_upload(self, uploaded_file) -> str:
+        """Keep the upload by content hash, so identical files share one copy and one index"""
+        return persist_upload(uploaded_file.getvalue(), 'json', '.json')[1]
+
+    def render_ui(self):
+        st.header("JSON大文件查询")
+        uploaded_file = st.file_uploader("上传JSON文件", type=["json"])
+        file = st.text_input(f"或输入 {JSON_ROOT} 下的JSON文件路径") if JSON_ROOT else ""
+        query = st.text_input("查询表达式（JSONPath）", value="$",
+                              help="支持 $.a.b、$['a']、[0]、[-1]、[1:5]、[*]、.*、..name、[0,2]")
+        limit = st.number_input("最多返回条数", min_value=1, max_value=10000, value=100)
+
+        if st.button("查询"):
+            if uploaded_file is not None:
+                file = self._persist_upload(uploaded_file)
+            if not file:
+                st.error("请上传文件或输入文件路径")
+                return
+            result = self.process(file, query, limit=limit)
+            if result['valid']:
+                index_note = "新建索引" if result['index']['built'] else "复用已有索引"
+                st.success(f"找到 {result['count']} 条结果（{index_note}，耗时 {result['index']['seconds']:.3f} 秒）")
+                if result['truncated']:
+                    st.warning("结果已截断，可调大返回条数")
+                st.json(result['matches'])
+            else:
+                st.error(f"❌ {result['message']}")
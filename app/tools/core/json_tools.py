@@ -1,12 +1,28 @@
 import json
+from typing import Any, Dict
+from ..base import BaseTool, ToolResult
+
+class JSONTool(BaseTool):
+    """Validates and formats JSON documents with configurable indentation"""
+
+    deterministic = True
 
-class JSONTool:
     def get_name(self):
         return "json_formatter"
 
     def get_description(self):
         return "Validates and formats JSON documents with configurable indentation"
 
+    def execute(self, params: Dict[str, Any] = None) -> ToolResult:
+        if not params or 'input_data' not in params:
+            return ToolResult(success=False, message="缺少JSON输入", data=None)
+        result = self.process(
+            params['input_data'],
+            action=params.get('action', 'format'),
+            indent=params.get('indent', 4)
+        )
+        return ToolResult(success=result['valid'], data=result, message=result.get('message'))
+
     def process(self, input_data: str, action: str = 'format', indent: int = 4) -> dict:
         try:
             data = json.loads(input_data)
@@ -2,25 +2,212 @@ import streamlit as st
 import pandas as pd
 import tabula
 import io
+import time
+import functools
 import PyPDF2
-import tempfile
 import os
-import re
-import time
 import logging
 import pdfplumber
-from typing import Dict, Any, List
-from ..base import BaseTool, ToolResult
+from typing import Callable, Dict, Any, Iterator, List, NamedTuple, Optional, Tuple
+from app.utils.resources import run_metered
+from app.utils.uploads import persist_upload
+from app.utils.workers import CAN_ISOLATE, shutdown_pool, worker_pool
+from ..base import BaseTool, Budget, ToolResult
+from .table_writers import WRITERS, TableWriter
+from .table_stitcher import TableStitcher
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('pdf_excel_tools')
 
+PASSWORD_REQUIRED_MESSAGE = "This PDF is password protected. Please provide the correct password."
+
+# Sheet holding extracted plain text; never stitched to tables
+TEXT_TABLE_NAME = 'Text_Content'
+
+# A page counts as tabular for the auto router when it has at least this many
+# ruling lines/rects, at this density per 100x100pt
+AUTO_MIN_RULING_LINES = 4
+AUTO_MIN_RULING_DENSITY = 0.05
+
+
+class ExtractedTable(NamedTuple):
+    name: str
+    page: Optional[int]
+    df: pd.DataFrame
+
+
+class PDFExtractionError(Exception):
+    """Extraction failure whose message is shown to the user as is"""
+
+
+class ConversionProgress:
+    """
+    Report conversion progress to an optional callback.
+
+    The callback receives dicts with an "event" key: "start" (total pages),
+    "page" after each page (pages done, tables so far, estimated seconds
+    left) and "table" for each extracted table, carrying its rows as NDJSON
+    when partial results are requested. tabula extracts all pages in one
+    call, so it only reports tables.
+    """
+
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None, partial_results: bool = False):
+        self.callback = callback
+        self.partial_results = partial_results
+        self.total_pages: Optional[int] = None
+        self.pages_done = 0
+        self.tables_found = 0
+        self._started = time.perf_counter()
+
+    def start(self, total_pages: Optional[int]) -> None:
+        self.total_pages = total_pages
+        self._started = time.perf_counter()
+        self._emit({'event': 'start', 'total_pages': total_pages})
+
+    def page_done(self, page_number: int) -> None:
+        self.pages_done += 1
+        if self.callback is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        remaining = None
+        if self.total_pages:
+            remaining = round(elapsed / self.pages_done * (self.total_pages - self.pages_done), 3)
+        self._emit({
+            'event': 'page',
+            'page': page_number,
+            'pages_done': self.pages_done,
+            'total_pages': self.total_pages,
+            'tables_found': self.tables_found,
+            'elapsed_seconds': round(elapsed, 3),
+            'eta_seconds': remaining,
+        })
+
+    def track(self, tables: Iterator['ExtractedTable']) -> Iterator['ExtractedTable']:
+        """Pass tables through, announcing each one as it is extracted"""
+        for table in tables:
+            if not table.df.empty:
+                self.tables_found += 1
+                if self.callback is not None:
+                    event = {'event': 'table', 'name': table.name, 'page': table.page,
+                             'rows': len(table.df), 'columns': [str(c) for c in table.df.columns]}
+                    if self.partial_results:
+                        event['ndjson'] = table.df.to_json(orient='records', lines=True, force_ascii=False)
+                    self._emit(event)
+            yield table
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        if self.callback is None:
+            return
+        try:
+            self.callback(event)
+        except Exception:
+            # A broken consumer must not abort the conversion
+            logger.exception("Progress callback failed")
+
+
+@functools.lru_cache(maxsize=None)
+def _start_tabula_jvm() -> bool:
+    """
+    Start tabula's JVM up front so the first request does not pay for it.
+    tabula-py reuses an already running JVM; without jpype or Java it falls
+    back to a subprocess per call, which needs no warming.
+    """
+    try:
+        import jpype
+        import jpype.imports
+        from tabula.backend import jar_path
+    except ImportError:
+        return False
+    try:
+        if not jpype.isJVMStarted():
+            jpype.addClassPath(jar_path())
+            jpype.startJVM("-Djava.awt.headless=true", "-Dfile.encoding=UTF8", convertStrings=False)
+            logger.info("Started JVM for tabula")
+        # Load tabula's classes now rather than on the first conversion
+        import technology.tabula  # noqa: F401
+        return True
+    except Exception as e:
+        logger.warning("Could not start the JVM for tabula, it will fall back to a subprocess: %s", e)
+        return False
+
+
+def _convert_for_ui(digest: str, options: Tuple, _tool: 'PDFToExcelConverter', _pdf_path: str,
+                    _progress_callback: Optional[Callable] = None,
+                    _converted: Optional[List[bool]] = None) -> Tuple[str, bytes, Optional[Dict[str, Any]]]:
+    """
+    Web UI conversions shared by every session, keyed by the upload's SHA-256
+    and the options. Failures raise PDFExtractionError so they are not cached.
+    A True is appended to _converted when this call converted rather than
+    being answered from the cache.
+    """
+    if _converted is not None:
+        _converted.append(True)
+    extraction_method, pages, password, merge_tables, output_format = options
+    result = run_metered(_tool, {
+        "pdf_file": _pdf_path,
+        "extraction_method": extraction_method,
+        "pages": pages,
+        "password": password,
+        "merge_tables": merge_tables,
+        "output_format": output_format,
+        "progress_callback": _progress_callback,
+    })
+    if not result.success:
+        raise PDFExtractionError(result.message)
+    return result.message, result.data.getvalue(), result.metadata
+
+
+@functools.lru_cache(maxsize=None)
+def _ui_conversion_cache() -> Callable:
+    """Wrap _convert_for_ui in st.cache_data on first use by the web UI, so that
+    the API, which imports this module too, never loads Streamlit's cache runtime"""
+    return st.cache_data(max_entries=32, ttl=3600, show_spinner=False)(_convert_for_ui)
+
+
 class PDFToExcelConverter(BaseTool):
     """Convert PDF files to Excel format"""
 
-    def execute(self, params: Dict[str, Any] = None) -> ToolResult:
+    # Conversions are memory hungry; bound how many run at once per process
+    pool_size = int(os.environ.get('DEVTOOLS_PDF_POOL_SIZE', '2'))
+    # A single malformed PDF can take minutes and gigabytes; run each
+    # conversion in a worker process that is killed when over budget
+    budget = Budget.from_env('PDF', max_pages=2000, max_input_bytes=256 * 1024 * 1024,
+                             timeout=600, max_memory_mb=4096)
+    file_params = ('pdf_file',)
+
+    def setup(self) -> None:
+        if self.budget.isolated and CAN_ISOLATE:
+            # Conversions run in worker processes that start their own JVM;
+            # starting one here as well would only cost memory
+            self._jvm_started = False
+            worker_pool(type(self)).start()
+        else:
+            self._jvm_started = _start_tabula_jvm()
+
+    def setup_worker(self) -> None:
+        self._jvm_started = _start_tabula_jvm()
+
+    def teardown(self) -> None:
+        shutdown_pool(type(self))
+
+    def count_pages(self, params: Dict[str, Any]) -> Optional[int]:
+        try:
+            pdf_reader = PyPDF2.PdfReader(params['pdf_file'])
+            if pdf_reader.is_encrypted:
+                pdf_reader.decrypt(params.get('password') or '')
+            return len(self._parse_pages(params.get('pages', 'all'), len(pdf_reader.pages)))
+        except Exception:
+            # Unreadable or locked; extraction reports the actual problem
+            return None
+
+    def health_check(self) -> bool:
+        if getattr(self, '_jvm_started', False):
+            import jpype
+            return jpype.isJVMStarted()
+        return True
+
+    def execute(self, params: Dict[str, Any] = None, output_file: Optional[str] = None) -> ToolResult:
+        """Convert params['pdf_file']. The result is written to output_file when one is given, which only
+        the server chooses: it is never read from params, since those come from clients."""
         if not params or 'pdf_file' not in params:
             return ToolResult(success=False, message="Missing PDF file", data=None)
 
@@ -29,345 +216,320 @@ class PDFToExcelConverter(BaseTool):
         pages = params.get('pages', 'all')
         password = params.get('password', '')
         merge_tables = params.get('merge_tables', False)
-        
-        logger.debug(f"Starting PDF conversion with parameters: extraction_method={extraction_method}, "
-                    f"pages={pages}, merge_tables={merge_tables}")
-        
-        temp_excel_path = None
-        excel_data = None
-        
+        output_format = params.get('output_format', 'xlsx')
+        progress = ConversionProgress(params.get('progress_callback'), params.get('partial_results', False))
+
+        logger.debug("Starting PDF conversion with parameters: extraction_method=%s, pages=%s, "
+                     "merge_tables=%s, output_format=%s", extraction_method, pages, merge_tables, output_format)
+
+        page_report: List[Dict[str, Any]] = []
+        extractors = {
+            'auto': functools.partial(self._extract_auto, report=page_report),
+            'tabula': self._extract_tabula,
+            'pdfplumber': self._extract_pdfplumber,
+            'text': self._extract_text,
+        }
+        if extraction_method not in extractors:
+            return ToolResult(
+                success=False,
+                message=f"Unsupported extraction method: {extraction_method}",
+                data=None
+            )
+        if output_format not in WRITERS:
+            return ToolResult(
+                success=False,
+                message=f"Unsupported output format: {output_format}",
+                data=None
+            )
+
+        # Write into output_file when given so large results never sit in memory
+        output = open(output_file, 'wb') if output_file else io.BytesIO()
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp_excel:
-                temp_excel_path = temp_excel.name
-                logger.debug(f"Created temporary Excel file: {temp_excel_path}")
-                
-            if extraction_method == 'tabula':
-                # Use tabula for table extraction
-                try:
-                    logger.debug(f"Using tabula to extract tables from {pdf_file}")
-                    if pages == 'all':
-                        tables = tabula.read_pdf(
-                            pdf_file, 
-                            pages='all', 
-                            multiple_tables=True,
-                            password=password if password else None
-                        )
-                    else:
-                        tables = tabula.read_pdf(
-                            pdf_file, 
-                            pages=pages, 
-                            multiple_tables=True,
-                            password=password if password else None
-                        )
-                    logger.debug(f"Extracted {len(tables)} tables from PDF")
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Error in tabula extraction: {error_msg}")
-                    if "password is incorrect" in error_msg:
-                        return ToolResult(
-                            success=False, 
-                            message="This PDF is password protected. Please provide the correct password.", 
-                            data=None
-                        )
-                    raise e
-                
-                if not tables:
-                    logger.warning("No tables found in the PDF")
-                    return ToolResult(
-                        success=False, 
-                        message="No tables found in the PDF", 
-                        data=None
-                    )
-                
-                # Process the tables
-                if merge_tables and len(tables) > 0:
-                    logger.debug("Attempting to merge tables")
-                    
-                    # Check for duplicate columns and make them unique
-                    for i in range(len(tables)):
-                        # Check if there are any duplicate column names
-                        if tables[i].columns.duplicated().any():
-                            logger.debug(f"Table {i+1} has duplicate columns, making them unique")
-                            # Make columns unique by appending a suffix
-                            tables[i].columns = self._make_unique_columns(tables[i].columns)
-                    
-                    try:
-                        # Merge all tables into a single dataframe
-                        logger.debug("Merging tables into a single DataFrame")
-                        merged_df = pd.concat(tables, ignore_index=True)
-                        logger.debug(f"Merged DataFrame has shape: {merged_df.shape}")
-                        
-                        # Write to Excel
-                        logger.debug(f"Writing merged DataFrame to Excel: {temp_excel_path}")
-                        with pd.ExcelWriter(temp_excel_path) as writer:
-                            merged_df.to_excel(writer, sheet_name='Merged_Tables', index=False)
-                            
-                    except ValueError as e:
-                        # If merging still fails, write each table to a separate sheet
-                        error_msg = str(e)
-                        logger.warning(f"Error merging tables: {error_msg}. Writing tables to separate sheets.")
-                        with pd.ExcelWriter(temp_excel_path) as writer:
-                            for i, table in enumerate(tables):
-                                if not table.empty:
-                                    # Ensure no duplicate column names
-                                    if table.columns.duplicated().any():
-                                        logger.debug(f"Table {i+1} has duplicate columns, making them unique")
-                                        table.columns = self._make_unique_columns(table.columns)
-                                    sheet_name = f'Table_{i+1}'
-                                    if len(sheet_name) > 31:  # Excel sheet name length limit
-                                        sheet_name = sheet_name[:31]
-                                    logger.debug(f"Writing table {i+1} to sheet: {sheet_name}")
-                                    table.to_excel(writer, sheet_name=sheet_name, index=False)
-                            
-                        return ToolResult(
-                            success=True, 
-                            data=self._read_excel_to_memory(temp_excel_path),
-                            message=f"Tables could not be merged due to inconsistent structures. Each table has been saved as a separate sheet. Error: {error_msg}"
-                        )
+            tables = progress.track(extractors[extraction_method](pdf_file, pages, password, progress))
+            with WRITERS[output_format](output) as writer:
+                if merge_tables and extraction_method != 'text':
+                    message = self._write_merged(tables, writer)
                 else:
-                    # Write each table to a separate sheet
-                    logger.debug("Writing each table to a separate sheet")
-                    with pd.ExcelWriter(temp_excel_path) as writer:
-                        for i, table in enumerate(tables):
-                            if not table.empty:
-                                # Ensure no duplicate column names
-                                if table.columns.duplicated().any():
-                                    logger.debug(f"Table {i+1} has duplicate columns, making them unique")
-                                    table.columns = self._make_unique_columns(table.columns)
-                                sheet_name = f'Table_{i+1}'
-                                if len(sheet_name) > 31:  # Excel sheet name length limit
-                                    sheet_name = sheet_name[:31]
-                                logger.debug(f"Writing table {i+1} to sheet: {sheet_name}")
-                                table.to_excel(writer, sheet_name=sheet_name, index=False)
-            
-            elif extraction_method == 'pdfplumber':
-                # Use pdfplumber for table extraction
-                logger.debug(f"Using pdfplumber to extract tables from {pdf_file}")
-                
-                try:
-                    tables = []
-                    page_numbers = []
-                    
-                    with pdfplumber.open(pdf_file, password=password if password else None) as pdf:
-                        if pages == 'all':
-                            page_range = range(len(pdf.pages))
-                        else:
-                            # Convert pages string to list of page numbers
-                            page_list = [int(p) for p in pages.split(',')]
-                            page_range = [p-1 for p in page_list if 0 < p <= len(pdf.pages)]
-                        
-                        for page_num in page_range:
-                            if page_num < len(pdf.pages):
-                                page = pdf.pages[page_num]
-                                extracted_tables = page.extract_tables()
-                                
-                                for table in extracted_tables:
-                                    if table and len(table) > 0:
-                                        # Use first row as header
-                                        headers = table[0]
-                                        data = table[1:]
-                                        
-                                        # Create DataFrame
-                                        df = pd.DataFrame(data, columns=headers)
-                                        
-                                        # Clean up the DataFrame - remove empty rows and columns
-                                        df = df.dropna(how='all').reset_index(drop=True)
-                                        df = df.dropna(axis=1, how='all')
-                                        
-                                        # Add to tables list if not empty
-                                        if not df.empty:
-                                            tables.append(df)
-                                            page_numbers.append(page_num + 1)
-                    
-                    logger.debug(f"Extracted {len(tables)} tables from PDF using pdfplumber")
-                    
-                    if not tables:
-                        logger.warning("No tables found in the PDF with pdfplumber")
-                        return ToolResult(
-                            success=False, 
-                            message="No tables found in the PDF using pdfplumber", 
-                            data=None
-                        )
-                    
-                    # Process the tables - similar to tabula section
-                    if merge_tables and len(tables) > 0:
-                        logger.debug("Attempting to merge tables")
-                        
-                        # Check for duplicate columns and make them unique
-                        for i in range(len(tables)):
-                            # Check if there are any duplicate column names
-                            if tables[i].columns.duplicated().any():
-                                logger.debug(f"Table {i+1} has duplicate columns, making them unique")
-                                # Make columns unique by appending a suffix
-                                tables[i].columns = self._make_unique_columns(tables[i].columns)
-                        
-                        try:
-                            # Merge all tables into a single dataframe
-                            logger.debug("Merging tables into a single DataFrame")
-                            merged_df = pd.concat(tables, ignore_index=True)
-                            logger.debug(f"Merged DataFrame has shape: {merged_df.shape}")
-                            
-                            # Write to Excel
-                            logger.debug(f"Writing merged DataFrame to Excel: {temp_excel_path}")
-                            with pd.ExcelWriter(temp_excel_path) as writer:
-                                merged_df.to_excel(writer, sheet_name='Merged_Tables', index=False)
-                                
-                        except ValueError as e:
-                            # If merging still fails, write each table to a separate sheet
-                            error_msg = str(e)
-                            logger.warning(f"Error merging tables: {error_msg}. Writing tables to separate sheets.")
-                            with pd.ExcelWriter(temp_excel_path) as writer:
-                                for i, table in enumerate(tables):
-                                    if not table.empty:
-                                        # Ensure no duplicate column names
-                                        if table.columns.duplicated().any():
-                                            logger.debug(f"Table {i+1} has duplicate columns, making them unique")
-                                            table.columns = self._make_unique_columns(table.columns)
-                                        sheet_name = f'Table_Page{page_numbers[i]}'
-                                        if len(sheet_name) > 31:  # Excel sheet name length limit
-                                            sheet_name = sheet_name[:31]
-                                        logger.debug(f"Writing table {i+1} from page {page_numbers[i]} to sheet: {sheet_name}")
-                                        table.to_excel(writer, sheet_name=sheet_name, index=False)
-                                
-                            return ToolResult(
-                                success=True, 
-                                data=self._read_excel_to_memory(temp_excel_path),
-                                message=f"Tables could not be merged due to inconsistent structures. Each table has been saved as a separate sheet. Error: {error_msg}"
-                            )
-                    else:
-                        # Write each table to a separate sheet
-                        logger.debug("Writing each table to a separate sheet")
-                        with pd.ExcelWriter(temp_excel_path) as writer:
-                            for i, table in enumerate(tables):
-                                if not table.empty:
-                                    # Ensure no duplicate column names
-                                    if table.columns.duplicated().any():
-                                        logger.debug(f"Table {i+1} has duplicate columns, making them unique")
-                                        table.columns = self._make_unique_columns(table.columns)
-                                    sheet_name = f'Table_Page{page_numbers[i]}'
-                                    if len(sheet_name) > 31:  # Excel sheet name length limit
-                                        sheet_name = sheet_name[:31]
-                                    logger.debug(f"Writing table {i+1} from page {page_numbers[i]} to sheet: {sheet_name}")
-                                    table.to_excel(writer, sheet_name=sheet_name, index=False)
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Error in pdfplumber extraction: {error_msg}")
-                    if "password" in error_msg.lower():
-                        return ToolResult(
-                            success=False, 
-                            message="This PDF is password protected. Please provide the correct password.", 
-                            data=None
-                        )
-                    raise e
-            
-            elif extraction_method == 'text':
-                # Use PyPDF2 for text extraction
-                try:
-                    logger.debug(f"Using PyPDF2 to extract text from {pdf_file}")
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    
-                    # Check if PDF is encrypted and try to decrypt
-                    if pdf_reader.is_encrypted:
-                        if not password:
-                            return ToolResult(
-                                success=False, 
-                                message="This PDF is password protected. Please provide a password.", 
-                                data=None
-                            )
-                        try:
-                            pdf_reader.decrypt(password)
-                        except Exception:
-                            return ToolResult(
-                                success=False, 
-                                message="Incorrect password for the PDF file.", 
-                                data=None
-                            )
-                    
-                    all_text = []
-                    page_labels = []
-                    
-                    if pages == 'all':
-                        page_range = range(len(pdf_reader.pages))
-                    else:
-                        # Convert pages string to list of page numbers
-                        page_list = [int(p) for p in pages.split(',')]
-                        page_range = [p-1 for p in page_list if 0 < p <= len(pdf_reader.pages)]
-                    
-                    for page_num in page_range:
-                        page = pdf_reader.pages[page_num]
-                        all_text.append(page.extract_text())
-                        page_labels.append(f'Page {page_num+1}')
-                    
-                    # Create DataFrame from text
-                    df = pd.DataFrame({'Page': page_labels, 'Text': all_text})
-                    
-                    # Create a single sheet for text extraction, as merging is not relevant for text
-                    logger.debug(f"Writing text to Excel: {temp_excel_path}")
-                    with pd.ExcelWriter(temp_excel_path) as writer:
-                        df.to_excel(writer, sheet_name='Text_Content', index=False)
-                
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Error extracting text from PDF: {error_msg}")
-                    return ToolResult(
-                        success=False, 
-                        message=f"Error extracting text from PDF: {error_msg}", 
-                        data=None
-                    )
-            
-            else:
+                    message = None
+                    self._write_separate(tables, writer)
+                table_count = writer.table_count
+
+            if table_count == 0:
+                logger.warning("No tables found in the PDF with %s", extraction_method)
                 return ToolResult(
-                    success=False, 
-                    message=f"Unsupported extraction method: {extraction_method}", 
+                    success=False,
+                    message=f"No tables found in the PDF using {extraction_method}",
                     data=None
                 )
-            
-            # Read the Excel file into memory
-            logger.debug(f"Reading Excel file into memory: {temp_excel_path}")
-            excel_data = self._read_excel_to_memory(temp_excel_path)
-            
+
+            if output_file:
+                output.close()
+            else:
+                output.seek(0)
             return ToolResult(
-                success=True, 
-                data=excel_data, 
-                message="PDF successfully converted to Excel"
+                success=True,
+                data=output_file or output,
+                message=message or f"PDF successfully converted to {output_format.upper()}",
+                metadata={'pages': page_report} if page_report else None
             )
-        
+
+        except PDFExtractionError as e:
+            return ToolResult(success=False, message=str(e), data=None)
+        except MemoryError:
+            # Reported by run_metered as going over the memory budget
+            raise
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"Error converting PDF to Excel: {error_msg}")
+            logger.error("Error converting PDF to %s: %s", output_format, error_msg)
             return ToolResult(
-                success=False, 
-                message=f"Error converting PDF to Excel: {error_msg}", 
+                success=False,
+                message=f"Error converting PDF to {output_format.upper()}: {error_msg}",
                 data=None
             )
         finally:
-            # Clean up temp file in a safe way
-            if temp_excel_path and os.path.exists(temp_excel_path):
+            if output_file and not output.closed:
+                output.close()
+
+    def _extract_tabula(self, pdf_file, pages, password, progress: ConversionProgress) -> Iterator[ExtractedTable]:
+        logger.debug("Using tabula to extract tables from %s", pdf_file)
+        progress.start(None)
+        try:
+            tables = tabula.read_pdf(
+                pdf_file,
+                pages=pages,
+                multiple_tables=True,
+                password=password if password else None
+            )
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("Error in tabula extraction: %s", error_msg)
+            if "password is incorrect" in error_msg:
+                raise PDFExtractionError(PASSWORD_REQUIRED_MESSAGE)
+            raise
+        logger.debug("Extracted %s tables from PDF", len(tables))
+
+        # tabula does not report which page a table came from
+        for i, df in enumerate(tables):
+            yield ExtractedTable(f'Table_{i+1}', None, df)
+
+    def _extract_pdfplumber(self, pdf_file, pages, password, progress: ConversionProgress) -> Iterator[ExtractedTable]:
+        logger.debug("Using pdfplumber to extract tables from %s", pdf_file)
+        try:
+            with pdfplumber.open(pdf_file, password=password if password else None) as pdf:
+                page_range = self._parse_pages(pages, len(pdf.pages))
+                progress.start(len(page_range))
+                for page_num in page_range:
+                    page = pdf.pages[page_num]
+                    tables = self._plumber_page_tables(page)
+                    # Release the page's parsed objects before moving on
+                    page.flush_cache()
+                    yield from tables
+                    progress.page_done(page_num + 1)
+        except PDFExtractionError:
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("Error in pdfplumber extraction: %s", error_msg)
+            if "password" in error_msg.lower():
+                raise PDFExtractionError(PASSWORD_REQUIRED_MESSAGE)
+            raise
+
+    def _plumber_page_tables(self, page) -> List[ExtractedTable]:
+        tables = []
+        for table in page.extract_tables():
+            if not table:
+                continue
+            # Use first row as header
+            df = pd.DataFrame(table[1:], columns=table[0])
+            # Clean up the DataFrame - remove empty rows and columns
+            df = df.dropna(how='all').reset_index(drop=True)
+            df = df.dropna(axis=1, how='all')
+            if not df.empty:
+                tables.append(ExtractedTable(f'Table_Page{page.page_number}', page.page_number, df))
+        return tables
+
+    def _tabula_page_tables(self, pdf_file, page_number: int, password) -> List[ExtractedTable]:
+        tables = tabula.read_pdf(
+            pdf_file,
+            pages=page_number,
+            lattice=True,
+            multiple_tables=True,
+            password=password if password else None
+        )
+        return [ExtractedTable(f'Table_Page{page_number}', page_number, df) for df in tables if not df.empty]
+
+    def _scan_page(self, page) -> Dict[str, Any]:
+        """
+        Cheap pre-scan of a page using only the objects pdfplumber already parsed
+        """
+        ruling_lines = len(page.lines) + len(page.rects)
+        # Ruling lines per 100x100pt, so the threshold does not depend on page size
+        area = max(float(page.width * page.height), 1.0)
+        return {
+            'chars': len(page.chars),
+            'images': len(page.images),
+            'ruling_lines': ruling_lines,
+            'ruling_density': round(ruling_lines / (area / 10000), 3),
+        }
+
+    def _classify_page(self, scan: Dict[str, Any]) -> str:
+        if scan['chars'] == 0:
+            # No text layer; image-only pages would need OCR, which we do not do
+            return 'image' if scan['images'] else 'blank'
+        if scan['ruling_lines'] >= AUTO_MIN_RULING_LINES and scan['ruling_density'] >= AUTO_MIN_RULING_DENSITY:
+            return 'table'
+        return 'prose'
+
+    def _extract_auto(self, pdf_file, pages, password, progress: ConversionProgress,
+                      report: List[Dict[str, Any]]) -> Iterator[ExtractedTable]:
+        """
+        Route every page to the cheapest engine that works for it.
+
+        Blank and image-only pages are skipped, prose pages get plain text
+        extraction and ruled pages go to pdfplumber, falling back to tabula's
+        lattice mode when pdfplumber finds no table. Each page is recorded in
+        `report` with its classification, engine and timing. Text from prose
+        pages is emitted as one Text_Content table at the end.
+        """
+        logger.debug("Using automatic per-page routing for %s", pdf_file)
+        text_rows = []
+        try:
+            with pdfplumber.open(pdf_file, password=password if password else None) as pdf:
+                page_range = self._parse_pages(pages, len(pdf.pages))
+                progress.start(len(page_range))
+                for page_num in page_range:
+                    page = pdf.pages[page_num]
+                    started = time.perf_counter()
+                    scan = self._scan_page(page)
+                    kind = self._classify_page(scan)
+                    tables: List[ExtractedTable] = []
+                    engine = 'skip'
+
+                    if kind == 'table':
+                        engine = 'pdfplumber'
+                        tables = self._plumber_page_tables(page)
+                        if not tables:
+                            engine = 'tabula'
+                            try:
+                                tables = self._tabula_page_tables(pdf_file, page_num + 1, password)
+                            except Exception as e:
+                                logger.warning("tabula fallback failed on page %s: %s", page_num + 1, e)
+                        if not tables:
+                            # Ruled but not tabular (boxes, underlines): keep its text
+                            engine += '+text'
+                            kind = 'prose'
+                    if kind == 'prose':
+                        if engine == 'skip':
+                            engine = 'text'
+                        text_rows.append((f'Page {page_num+1}', page.extract_text()))
+
+                    elapsed = time.perf_counter() - started
+                    report.append({
+                        'page': page_num + 1,
+                        'kind': kind,
+                        'engine': engine,
+                        'tables': len(tables),
+                        'seconds': round(elapsed, 4),
+                        **scan,
+                    })
+                    logger.debug("Page %s classified as %s, handled by %s in %.3fs", page_num + 1, kind, engine, elapsed)
+                    page.flush_cache()
+                    yield from tables
+                    progress.page_done(page_num + 1)
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("Error in automatic extraction: %s", error_msg)
+            if "password" in error_msg.lower():
+                raise PDFExtractionError(PASSWORD_REQUIRED_MESSAGE)
+            raise
+
+        if text_rows:
+            yield ExtractedTable(TEXT_TABLE_NAME, None, pd.DataFrame(text_rows, columns=['Page', 'Text']))
+
+    def _extract_text(self, pdf_file, pages, password, progress: ConversionProgress) -> Iterator[ExtractedTable]:
+        logger.debug("Using PyPDF2 to extract text from %s", pdf_file)
+        try:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+
+            # Check if PDF is encrypted and try to decrypt
+            if pdf_reader.is_encrypted:
+                if not password:
+                    raise PDFExtractionError("This PDF is password protected. Please provide a password.")
                 try:
-                    os.unlink(temp_excel_path)
-                except (PermissionError, OSError):
-                    # If file is still in use, we'll just leave it for the OS to clean up later
-                    pass
-    
-    def _read_excel_to_memory(self, excel_path):
+                    pdf_reader.decrypt(password)
+                except Exception:
+                    raise PDFExtractionError("Incorrect password for the PDF file.")
+
+            all_text = []
+            page_labels = []
+            page_range = self._parse_pages(pages, len(pdf_reader.pages))
+            progress.start(len(page_range))
+            for page_num in page_range:
+                all_text.append(pdf_reader.pages[page_num].extract_text())
+                page_labels.append(f'Page {page_num+1}')
+                progress.page_done(page_num + 1)
+        except PDFExtractionError:
+            raise
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("Error extracting text from PDF: %s", error_msg)
+            raise PDFExtractionError(f"Error extracting text from PDF: {error_msg}")
+
+        # A single sheet for text extraction, as merging is not relevant for text
+        yield ExtractedTable(TEXT_TABLE_NAME, None, pd.DataFrame({'Page': page_labels, 'Text': all_text}))
+
+    def _parse_pages(self, pages, page_count: int) -> List[int]:
         """
-        Read an Excel file into memory as BytesIO object, with proper error handling
+        Turn 'all' or a spec like '1,3,5-7' into zero-based page indexes, dropping out-of-range pages
         """
-        max_retries = 3
-        retry_delay = 0.5
-        
-        for attempt in range(max_retries):
-            try:
-                with open(excel_path, 'rb') as f:
-                    return io.BytesIO(f.read())
-            except PermissionError:
-                if attempt < max_retries - 1:
-                    # Wait a bit before trying again
-                    time.sleep(retry_delay)
-                else:
-                    raise
-    
+        if not pages or pages == 'all':
+            return list(range(page_count))
+
+        page_list = []
+        for part in str(pages).split(','):
+            part = part.strip()
+            if '-' in part:
+                first, last = part.split('-', 1)
+                page_list.extend(range(int(first), int(last) + 1))
+            elif part:
+                page_list.append(int(part))
+        return [p-1 for p in page_list if 0 < p <= page_count]
+
+    def _prepare_table(self, table: ExtractedTable) -> pd.DataFrame:
+        df = table.df
+        # Ensure no duplicate column names
+        if df.columns.duplicated().any():
+            logger.debug("Table %s has duplicate columns, making them unique", table.name)
+            df.columns = self._make_unique_columns(df.columns)
+        return df
+
+    def _write_separate(self, tables: Iterator[ExtractedTable], writer: TableWriter) -> None:
+        """Write each table as soon as it is extracted, so only one is held in memory"""
+        for table in tables:
+            if table.df.empty:
+                continue
+            df = self._prepare_table(table)
+            name = writer.write_table(table.name, df)
+            logger.debug("Wrote table %s (%s rows) as %s", table.name, len(df), name)
+
+    def _write_merged(self, tables: Iterator[ExtractedTable], writer: TableWriter) -> Optional[str]:
+        """Stitch continuation tables together as pages arrive instead of collecting and concatenating"""
+        stitcher = TableStitcher(writer)
+        for table in tables:
+            if table.df.empty:
+                continue
+            if table.name == TEXT_TABLE_NAME:
+                stitcher.close()
+                writer.write_table(table.name, table.df)
+                continue
+            continued = stitcher.add(table.name, table.page, self._prepare_table(table))
+            logger.debug("Table %s %s", table.name, "continues the previous table" if continued else "starts a new table")
+        stitcher.close()
+
+        if stitcher.input_count == 0:
+            return None
+        return f"Merged {stitcher.input_count} tables into {stitcher.output_count}"
+
     def _make_unique_columns(self, columns):
         """
         Create unique column names by appending a suffix (_1, _2, etc.) to duplicates
@@ -386,9 +548,18 @@ class PDFToExcelConverter(BaseTool):
                 
         return new_columns
 
+    def _show_progress(self, progress_bar, event: Dict[str, Any]) -> None:
+        if event['event'] == 'page' and event['total_pages']:
+            text = f"Page {event['pages_done']}/{event['total_pages']} - {event['tables_found']} tables found"
+            if event['eta_seconds'] is not None:
+                text += f" - about {event['eta_seconds']:.0f}s left"
+            progress_bar.progress(event['pages_done'] / event['total_pages'], text=text)
+        elif event['event'] == 'table' and event['page'] is None:
+            progress_bar.progress(1.0, text=f"Found table {event['name']} ({event['rows']} rows)")
+
     def render_ui(self) -> None:
         st.write("## PDF to Excel Converter")
-        st.write("Convert tables and text from PDF files to Excel format")
+        st.write("Convert tables and text from PDF files to Excel, CSV, Parquet or NDJSON")
         
         uploaded_file = st.file_uploader("Upload PDF", type=["pdf"])
         
@@ -397,9 +568,9 @@ class PDFToExcelConverter(BaseTool):
         with col1:
             extraction_method = st.selectbox(
                 "Extraction Method", 
-                ["tabula", "pdfplumber", "text"], 
+                ["tabula", "pdfplumber", "text", "auto"], 
                 index=0,
-                help="Tabula: Extract structured tables (requires Java). PDFPlumber: Alternative table extraction. Text: Extract all text content."
+                help="Tabula: Extract structured tables (requires Java). PDFPlumber: Alternative table extraction. Text: Extract all text content. Auto: Pick the cheapest engine for each page."
             )
         
         with col2:
@@ -421,51 +592,89 @@ class PDFToExcelConverter(BaseTool):
         
         with col4:
             merge_tables = st.checkbox(
-                "Merge All Tables",
+                "Merge Tables Across Pages",
                 value=False,
-                help="Merge all tables from all pages into a single sheet"
+                help="Join tables that continue across page breaks (same columns, repeated or missing header) into a single sheet"
             )
+
+        output_format = st.selectbox(
+            "Output Format",
+            list(WRITERS),
+            index=0,
+            help="xlsx: Excel workbook. csv: ZIP with one CSV per table. parquet: ZIP with one Parquet file per table (requires pyarrow). ndjson: one JSON object per row."
+        )
         
-        if uploaded_file is not None:
-            # Save the uploaded file to a temporary location
-            pdf_path = None
+        if uploaded_file is None:
+            self._forget_upload()
+            return
+
+        digest, pdf_path = self._session_upload(uploaded_file)
+        options = (extraction_method, pages, password, merge_tables, output_format)
+
+        if st.button("Convert"):
+            progress_bar = st.progress(0.0, text="Converting PDF...")
+            converted: List[bool] = []
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
-                    temp_pdf.write(uploaded_file.getvalue())
-                    pdf_path = temp_pdf.name
-                
-                if st.button("Convert to Excel"):
-                    with st.spinner("Converting PDF to Excel..."):
-                        result = self.execute({
-                            "pdf_file": pdf_path, 
-                            "extraction_method": extraction_method,
-                            "pages": pages,
-                            "password": password,
-                            "merge_tables": merge_tables
-                        })
-                    
-                    if result.success:
-                        st.success(result.message)
-                        
-                        # Create a download button for the Excel file
-                        excel_data = result.data
-                        if excel_data:
-                            excel_data.seek(0)  # Reset the BytesIO pointer
-                            
-                            file_name = uploaded_file.name.replace(".pdf", ".xlsx")
-                            st.download_button(
-                                label="Download Excel File",
-                                data=excel_data,
-                                file_name=file_name,
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
-                    else:
-                        st.error(result.message)
-            finally:
-                # Clean up temporary file
-                if pdf_path and os.path.exists(pdf_path):
-                    try:
-                        os.unlink(pdf_path)
-                    except (PermissionError, OSError):
-                        # If file is still in use, we'll just leave it
-                        pass
+                with st.spinner("Converting PDF..."):
+                    message, output_data, metadata = _ui_conversion_cache()(
+                        digest, options, self, pdf_path,
+                        lambda event: self._show_progress(progress_bar, event),
+                        converted
+                    )
+                st.session_state['pdf_result'] = {
+                    'digest': digest, 'options': options, 'message': message,
+                    'data': output_data, 'metadata': metadata, 'cached': not converted,
+                }
+            except PDFExtractionError as e:
+                st.session_state.pop('pdf_result', None)
+                st.error(str(e))
+            progress_bar.empty()
+
+        # Keep showing the last result of this upload, so downloading it or
+        # touching a widget does not convert again
+        result = st.session_state.get('pdf_result')
+        if not result or result['digest'] != digest:
+            return
+        if result['options'] != options:
+            st.info("Options changed since this result was converted. Press Convert to apply them.")
+        st.success(result['message'])
+        resources = (result['metadata'] or {}).get('resources')
+        if resources:
+            peak = resources.get('peak_rss_mb') or resources.get('rss_mb')
+            usage = f"{resources['wall_seconds']:.1f}s, peak memory {peak} MB"
+            if result['cached']:
+                st.caption(f"Cached result; the original conversion took {usage}")
+            else:
+                st.caption(f"Took {usage}")
+        if result['metadata'] and result['metadata'].get('pages'):
+            with st.expander("Per-page routing"):
+                st.dataframe(pd.DataFrame(result['metadata']['pages']))
+
+        if result['data']:
+            result_format = result['options'][-1]
+            writer_cls = WRITERS[result_format]
+            file_name = os.path.splitext(uploaded_file.name)[0] + writer_cls.extension
+            st.download_button(
+                label=f"Download {result_format.upper()} File",
+                data=result['data'],
+                file_name=file_name,
+                mime=writer_cls.mime_type
+            )
+
+    def _session_upload(self, uploaded_file) -> Tuple[str, str]:
+        """Write an upload to disk once per session; returns its SHA-256 and path.
+
+        The file is stored by content hash and shared by every session that
+        uploads the same PDF; persist_upload deletes it once it goes unused.
+        """
+        saved = st.session_state.get('pdf_upload')
+        if saved and saved['file_id'] == uploaded_file.file_id and os.path.exists(saved['path']):
+            return saved['digest'], saved['path']
+
+        digest, path = persist_upload(uploaded_file.getvalue(), 'pdf', '.pdf')
+        st.session_state['pdf_upload'] = {'file_id': uploaded_file.file_id, 'digest': digest, 'path': path}
+        return digest, path
+
+    def _forget_upload(self) -> None:
+        # The file itself may be shared with other sessions; it expires on its own
+        st.session_state.pop('pdf_upload', None)
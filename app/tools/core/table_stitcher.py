@@ -0,0 +1,115 @@
+import re
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .table_writers import TableWriter
+
+_NUMBER = re.compile(r'^[-+(]?[$€£¥]?\s*\d[\d,.\s]*%?\)?$')
+_UNNAMED = re.compile(r'^unnamed: \d+$')
+
+
+def _normalize(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    text = ' '.join(str(value).split()).lower()
+    # tabula names header-less columns "Unnamed: 0", "Unnamed: 1", ...
+    return '' if _UNNAMED.match(text) else text
+
+
+def _cell_kind(value) -> str:
+    text = _normalize(value)
+    if not text:
+        return 'empty'
+    return 'number' if _NUMBER.match(text) else 'text'
+
+
+class TableStitcher:
+    """Stitch tables that continue across page breaks into running output tables.
+
+    Tables are fed in document order. A table continues the open one when it
+    has the same number of columns, starts on the same or the next page and
+    either repeats the open table's header or has no header at all (its
+    "header" row looks like a data row of the open table). Continuations are
+    appended straight to the writer; anything else starts a new output table.
+    Only the open table's header and the shape of its last row are kept, so
+    memory does not grow with the number of pages.
+    """
+
+    def __init__(self, writer: TableWriter, prefix: str = 'Merged'):
+        self.writer = writer
+        self.prefix = prefix
+        self.input_count = 0
+        self.output_count = 0
+        self._columns: Optional[List[str]] = None
+        self._header: Optional[List[str]] = None
+        self._last_row_kinds: Optional[Tuple[str, ...]] = None
+        self._last_page: Optional[int] = None
+
+    def add(self, name: str, page: Optional[int], df: pd.DataFrame) -> bool:
+        """Write one extracted table; returns True when it continued the open table"""
+        self.input_count += 1
+        continued = self._continuation_rows(page, df)
+        if continued is None:
+            self.writer.begin_table(f'{self.prefix}_{name}')
+            self.output_count += 1
+            self._columns = [str(c) for c in df.columns]
+            self._header = [_normalize(c) for c in df.columns]
+            rows = df
+        else:
+            rows = continued
+
+        rows = self._drop_repeated_headers(rows)
+        if not rows.empty:
+            self.writer.append_rows(rows)
+            self._last_row_kinds = tuple(_cell_kind(v) for v in rows.iloc[-1])
+        self._last_page = page
+        return continued is not None
+
+    def close(self) -> None:
+        self.writer.end_table()
+        self._columns = self._header = self._last_row_kinds = None
+
+    def _continuation_rows(self, page: Optional[int], df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Return df's rows re-labelled to the open table's columns, or None if it is a new table"""
+        if self._columns is None or len(df.columns) != len(self._columns):
+            return None
+        if page is not None and self._last_page is not None and page - self._last_page not in (0, 1):
+            return None
+
+        header = [_normalize(c) for c in df.columns]
+        if header == self._header:
+            # Repeated header on the new page
+            return df.set_axis(self._columns, axis=1)
+
+        if self._looks_like_data(df.columns, header):
+            # No header on the continuation: its first row was taken as the header
+            first_row = pd.DataFrame([list(df.columns)], columns=self._columns)
+            return pd.concat([first_row, df.set_axis(self._columns, axis=1)], ignore_index=True)
+        return None
+
+    def _looks_like_data(self, raw_header: Sequence, header: List[str]) -> bool:
+        if self._last_row_kinds is None:
+            return False
+        if any(h and h in self._header for h in header):
+            return False
+        kinds = tuple(_cell_kind(v) for v in raw_header)
+        if kinds == self._last_row_kinds:
+            return True
+        # Text columns may hold numbers and vice versa; require every number
+        # in the candidate row to sit in a column that held a number before
+        return 'number' in kinds and all(
+            kind != 'number' or last == 'number' for kind, last in zip(kinds, self._last_row_kinds)
+        )
+
+    def _drop_repeated_headers(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Remove rows that merely repeat the header (e.g. repeated on every printed page)"""
+        if df.empty:
+            return df
+        # Repeats sit at the top of a page's chunk; only look there
+        head = df.head(3)
+        normalized = head.map(_normalize) if hasattr(head, 'map') else head.applymap(_normalize)
+        repeated = (normalized == self._header).all(axis=1)
+        if not repeated.any():
+            return df
+        return df.drop(index=repeated[repeated].index)
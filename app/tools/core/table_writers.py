@@ -0,0 +1,231 @@
+import io
+import zipfile
+from typing import BinaryIO, Dict, Optional, Set, Type
+
+import pandas as pd
+
+
+class TableWriter:
+    """Stream named tables into a binary sink, one chunk of rows at a time.
+
+    A table is opened with begin_table, receives any number of append_rows
+    calls and is finished with end_table, so rows never have to be collected
+    before writing. Only one table is open at a time.
+    """
+
+    format_name = ''
+    extension = ''
+    mime_type = 'application/octet-stream'
+    max_name_length = 255
+
+    def __init__(self, sink: BinaryIO):
+        self.sink = sink
+        self.table_count = 0
+        self._names: Set[str] = set()
+        self._current: Optional[str] = None
+
+    def begin_table(self, name: str) -> str:
+        """Open a new table and return the (deduplicated) name it is stored under"""
+        if self._current is not None:
+            self.end_table()
+        self._current = self._unique_name(name)
+        self.table_count += 1
+        self._begin(self._current)
+        return self._current
+
+    def append_rows(self, df: pd.DataFrame) -> None:
+        self._append(df)
+
+    def end_table(self) -> None:
+        if self._current is not None:
+            self._end()
+            self._current = None
+
+    def write_table(self, name: str, df: pd.DataFrame) -> str:
+        name = self.begin_table(name)
+        self.append_rows(df)
+        self.end_table()
+        return name
+
+    def close(self) -> None:
+        self.end_table()
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        try:
+            self.close()
+        except Exception:
+            # Keep the original error rather than one from a half-written sink
+            pass
+
+    def _unique_name(self, name: str) -> str:
+        base = name[:self.max_name_length]
+        candidate, n = base, 1
+        while candidate in self._names:
+            n += 1
+            suffix = f'_{n}'
+            candidate = base[:self.max_name_length - len(suffix)] + suffix
+        self._names.add(candidate)
+        return candidate
+
+    def _begin(self, name: str) -> None:
+        pass
+
+    def _append(self, df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def _end(self) -> None:
+        pass
+
+    def _close(self) -> None:
+        pass
+
+
+class ExcelTableWriter(TableWriter):
+    """One sheet per table, written straight into the sink without a temp file"""
+
+    format_name = 'xlsx'
+    extension = '.xlsx'
+    mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    max_name_length = 31  # Excel sheet name length limit
+
+    def __init__(self, sink: BinaryIO):
+        super().__init__(sink)
+        self._writer = pd.ExcelWriter(sink, engine='openpyxl')
+        self._row = 0
+
+    def _begin(self, name: str) -> None:
+        self._row = 0
+
+    def _append(self, df: pd.DataFrame) -> None:
+        header = self._row == 0
+        df.to_excel(self._writer, sheet_name=self._current, startrow=self._row, header=header, index=False)
+        self._row += len(df) + (1 if header else 0)
+
+    def _close(self) -> None:
+        # openpyxl refuses to save a workbook without sheets
+        if self.table_count:
+            self._writer.close()
+
+
+class _ZipTableWriter(TableWriter):
+    """One archive member per table; members are streamed, so the sink need not be seekable"""
+
+    compression = zipfile.ZIP_DEFLATED
+
+    def __init__(self, sink: BinaryIO):
+        super().__init__(sink)
+        self._zip = zipfile.ZipFile(sink, 'w', compression=self.compression)
+        self._member = None
+
+    def _begin(self, name: str) -> None:
+        self._member = self._zip.open(name + self.member_extension, 'w', force_zip64=True)
+
+    def _end(self) -> None:
+        self._member.close()
+        self._member = None
+
+    def _close(self) -> None:
+        self._zip.close()
+
+
+class CSVZipTableWriter(_ZipTableWriter):
+    format_name = 'csv'
+    extension = '.zip'
+    member_extension = '.csv'
+    mime_type = 'application/zip'
+
+    def _begin(self, name: str) -> None:
+        super()._begin(name)
+        self._text = io.TextIOWrapper(self._member, encoding='utf-8', newline='')
+        self._header = True
+
+    def _append(self, df: pd.DataFrame) -> None:
+        df.to_csv(self._text, header=self._header, index=False)
+        self._header = False
+
+    def _end(self) -> None:
+        # Closing the wrapper flushes it and closes the archive member
+        self._text.close()
+        self._member = None
+
+
+class ParquetTableWriter(_ZipTableWriter):
+    """One Parquet file per table; pyarrow converts numeric columns without copying"""
+
+    format_name = 'parquet'
+    extension = '.zip'
+    member_extension = '.parquet'
+    mime_type = 'application/zip'
+    # Parquet pages are already compressed
+    compression = zipfile.ZIP_STORED
+
+    def __init__(self, sink: BinaryIO):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._pq = pq
+        super().__init__(sink)
+        self._parquet = None
+
+    def _begin(self, name: str) -> None:
+        super()._begin(name)
+        self._part = 1
+
+    def _append(self, df: pd.DataFrame) -> None:
+        pa = self._pa
+        if self._parquet is not None:
+            try:
+                table = pa.Table.from_pandas(df, schema=self._parquet.schema, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Rows that do not fit the types inferred from the first chunk
+                # go to a new part file with its own schema
+                self._end()
+                self._part += 1
+                super()._begin(f'{self._current}_part{self._part}')
+            else:
+                self._parquet.write_table(table)
+                return
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), b'devtools.table': self._current.encode('utf-8')}
+        table = table.replace_schema_metadata(metadata)
+        self._parquet = self._pq.ParquetWriter(pa.PythonFile(self._member, mode='w'), table.schema)
+        self._parquet.write_table(table)
+
+    def _end(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        super()._end()
+
+
+class NDJSONTableWriter(TableWriter):
+    """One JSON object per row, tagged with the table it came from in `_table`"""
+
+    format_name = 'ndjson'
+    extension = '.ndjson'
+    mime_type = 'application/x-ndjson'
+
+    def _append(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        text = df.assign(_table=self._current).to_json(orient='records', lines=True, force_ascii=False)
+        self.sink.write(text.encode('utf-8'))
+        if not text.endswith('\n'):
+            self.sink.write(b'\n')
+
+
+WRITERS: Dict[str, Type[TableWriter]] = {
+    writer.format_name: writer
+    for writer in (ExcelTableWriter, CSVZipTableWriter, ParquetTableWriter, NDJSONTableWriter)
+}
@@ -5,6 +5,8 @@ from ..base import BaseTool, ToolResult
 class TextCaseConverter(BaseTool):
     """Convert text between different cases (upper, lower, title)"""
 
+    deterministic = True
+
     def execute(self, params: Dict[str, Any] = None) -> ToolResult:
         if not params or 'text' not in params or 'case' not in params:
             return ToolResult(success=False, message="Missing parameters", data=None)
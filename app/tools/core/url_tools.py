@@ -6,6 +6,8 @@ from ..base import BaseTool, ToolResult
 
 class URLEncoder(BaseTool):
     """URL编码转换工具（支持完整编码和保留特殊字符）"""
+
+    deterministic = True
     
     def execute(self, params: Dict[str, Any] = None) -> ToolResult:
         if not params or 'text' not in params:
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+
+def cache_key(tool_name: str, params: Dict[str, Any]) -> str:
+    """Hash a tool name and its params independently of key order and whitespace"""
+    canonical = json.dumps([tool_name, params], sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    etag: str
+    expires_at: float
+    # Extra response headers describing the body, e.g. Content-Encoding
+    headers: Optional[Dict[str, str]] = None
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized responses, bounded by entry count and total bytes, with a TTL"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        env = os.environ.get
+        return cls(
+            max_entries=int(env('DEVTOOLS_CACHE_MAX_ENTRIES', '1024')),
+            max_bytes=int(env('DEVTOOLS_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            ttl=float(env('DEVTOOLS_CACHE_TTL', '300')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.peek(key)
+        self.record(entry is not None)
+        return entry
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Look key up without counting a hit or miss, for callers that count per request with record"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> CacheEntry:
+        entry = CacheEntry(body, make_etag(body), time.monotonic() + self.ttl, headers)
+        if not self.enabled or len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses}
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
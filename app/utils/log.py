@@ -0,0 +1,152 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Request id of the request currently being handled, set by the API middleware
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar('request_id', default='-')
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only one out of every N DEBUG records per call site.
+
+    Records are grouped by logger name and unformatted message template, so a
+    debug line emitted once per table or sheet is thinned out while rare debug
+    lines still get through. INFO and above are never sampled.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            return False
+        key = (record.name, str(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records without formatting them on the caller's thread.
+
+    The stock QueueHandler merges msg and args before enqueueing, which puts
+    the formatting cost back on the request path. Here the record is handed
+    over untouched and the listener thread does all formatting, so log
+    arguments must not be mutated after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(level: Optional[str] = None, json_format: Optional[bool] = None,
+                      log_file: Optional[str] = None, debug_sample_rate: Optional[float] = None) -> None:
+    """Route all logging through a queue drained by a background writer thread.
+
+    Unset arguments fall back to the DEVTOOLS_LOG_LEVEL, DEVTOOLS_LOG_JSON,
+    DEVTOOLS_LOG_FILE and DEVTOOLS_LOG_DEBUG_SAMPLE_RATE environment variables.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener, _queue_handler
+
+    env = os.environ.get
+    level = (level or env('DEVTOOLS_LOG_LEVEL', 'INFO')).upper()
+    if json_format is None:
+        json_format = env('DEVTOOLS_LOG_JSON', '').lower() in ('1', 'true', 'yes')
+    if log_file is None:
+        log_file = env('DEVTOOLS_LOG_FILE', '')
+    if debug_sample_rate is None:
+        debug_sample_rate = float(env('DEVTOOLS_LOG_DEBUG_SAMPLE_RATE', '1.0'))
+
+    formatter = JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    shutdown_logging()
+
+    _queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    # Filters run on the caller's thread, before the record is queued, so
+    # sampled-out records never reach the writer
+    _queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    _queue_handler.addFilter(RequestIdFilter())
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+
+
+def is_configured() -> bool:
+    return _listener is not None
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork() -> None:
+    # The writer thread does not survive fork(); give the child its own queue
+    # and thread with the same handlers.
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from pydantic import BaseModel, Field
+
+from app.tools.base import ToolResult
+from app.utils.registry import ToolRegistry
+from app.utils.resources import run_metered
+
+logger = logging.getLogger('pipeline')
+
+# Runs one step: (tool name, params) -> the tool's result
+StepRunner = Callable[[str, Dict[str, Any]], Awaitable[ToolResult]]
+
+
+class PipelineStep(BaseModel):
+    tool: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    # Param name -> reference to an earlier value, e.g. {"input_data": "$prev.result"}
+    inputs: Dict[str, str] = Field(default_factory=dict)
+    # Reference to a list; the tool then runs once per item, bound to "$item"
+    for_each: Optional[str] = None
+
+
+class PipelineRequest(BaseModel):
+    steps: List[PipelineStep] = Field(min_length=1)
+    input: Dict[str, Any] = Field(default_factory=dict)
+
+
+class PipelineError(Exception):
+    """A step failed or referenced something that does not exist"""
+
+    def __init__(self, step: int, message: str):
+        super().__init__(f"Step {step}: {message}")
+        self.step = step
+
+
+class _StepStats:
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.seconds = 0.0
+        self.items = 0
+
+    def as_dict(self, index: int) -> Dict[str, Any]:
+        return {'step': index, 'tool': self.tool, 'seconds': round(self.seconds, 6), 'items': self.items}
+
+
+class Pipeline:
+    """Run tool steps in-process, passing native values from one step to the next.
+
+    References select values produced earlier: "$input.<path>" (the request's
+    input), "$prev.<path>" (previous step's data), "$steps.<n>.<path>" (data
+    of step n) and, inside for_each steps, "$item.<path>". Paths walk dict
+    keys and list indexes. A for_each step whose output only feeds the next
+    step's for_each is not materialized: items stream through both tools one
+    at a time.
+
+    Steps run through runner, a coroutine function; the API passes one that
+    admits pooled tools like POST /tools does, so waiting steps do not hold
+    a thread. By default each step runs in a thread of its own.
+    """
+
+    def __init__(self, registry: ToolRegistry, request: PipelineRequest, runner: Optional[StepRunner] = None):
+        self.registry = registry
+        self.request = request
+        self.runner = runner or self._run_in_thread
+        self.stats = [_StepStats(step.tool) for step in request.steps]
+
+    async def run(self) -> ToolResult:
+        self._validate()
+        streamable = self._streamable_steps()
+        outputs: List[Any] = []
+        try:
+            for index, step in enumerate(self.request.steps):
+                if step.for_each is None:
+                    output = await self._run_once(index, step, outputs)
+                else:
+                    items = self._resolve(index, step.for_each, outputs, None)
+                    output = self._run_each(index, step, outputs, items)
+                    if index not in streamable:
+                        output = [value async for value in output]
+                outputs.append(output)
+        except PipelineError as e:
+            logger.warning("Pipeline failed: %s", e)
+            return ToolResult(success=False, data=None, message=str(e), metadata=self._metadata())
+
+        return ToolResult(success=True, data=outputs[-1], metadata=self._metadata())
+
+    def _metadata(self) -> Dict[str, Any]:
+        steps = [stats.as_dict(i) for i, stats in enumerate(self.stats)]
+        return {'steps': steps, 'seconds': round(sum(s['seconds'] for s in steps), 6)}
+
+    def _validate(self) -> None:
+        for index, step in enumerate(self.request.steps):
+            if self.registry.get_tool(step.tool) is None:
+                raise PipelineError(index, f"unknown tool {step.tool}")
+
+    def _streamable_steps(self) -> Set[int]:
+        """for_each steps whose output is read only by the next step's for_each"""
+        steps = self.request.steps
+        streamable = set()
+        for index in range(len(steps) - 1):
+            if steps[index].for_each is None or steps[index + 1].for_each is None:
+                continue
+            readers = [
+                ref
+                for at in range(index + 1, len(steps))
+                for ref in [*steps[at].inputs.values(), steps[at].for_each]
+                if ref and self._points_at(ref, index, at)
+            ]
+            if readers == [steps[index + 1].for_each]:
+                streamable.add(index)
+        return streamable
+
+    @staticmethod
+    def _points_at(ref: str, target: int, at: int) -> bool:
+        parts = ref.split('.')
+        if parts[0] == '$prev':
+            return at - 1 == target
+        return parts[0] == '$steps' and len(parts) > 1 and parts[1] == str(target)
+
+    async def _run_once(self, index: int, step: PipelineStep, outputs: List[Any]) -> Any:
+        params = self._params(index, step, outputs, None)
+        stats = self.stats[index]
+        return await self._call(index, step.tool, params, stats)
+
+    async def _run_each(self, index: int, step: PipelineStep, outputs: List[Any], items: Any) -> AsyncIterator[Any]:
+        stats = self.stats[index]
+        async for item in self._iterate(index, step, items):
+            params = self._params(index, step, outputs, item)
+            yield await self._call(index, step.tool, params, stats)
+
+    @staticmethod
+    async def _iterate(index: int, step: PipelineStep, items: Any) -> AsyncIterator[Any]:
+        # A streamed previous step hands over its async generator
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                yield item
+            return
+        if isinstance(items, (str, bytes, dict)) or not hasattr(items, '__iter__'):
+            raise PipelineError(index, f"for_each reference {step.for_each} is not a list")
+        for item in items:
+            yield item
+
+    async def _call(self, index: int, tool_name: str, params: Dict[str, Any], stats: _StepStats) -> Any:
+        started = time.perf_counter()
+        result = await self.runner(tool_name, params)
+        stats.seconds += time.perf_counter() - started
+        stats.items += 1
+        if not result.success:
+            raise PipelineError(index, f"{tool_name} failed: {result.message or result.data}")
+        return result.data
+
+    async def _run_in_thread(self, tool_name: str, params: Dict[str, Any]) -> ToolResult:
+        return await asyncio.to_thread(self._run_step, tool_name, params)
+
+    def _run_step(self, tool_name: str, params: Dict[str, Any]) -> ToolResult:
+        with self.registry.acquire(tool_name) as tool:
+            return run_metered(tool, params)
+
+    def _params(self, index: int, step: PipelineStep, outputs: List[Any], item: Any) -> Dict[str, Any]:
+        params = dict(step.params)
+        for name, ref in step.inputs.items():
+            params[name] = self._resolve(index, ref, outputs, item)
+        return params
+
+    def _resolve(self, index: int, ref: str, outputs: List[Any], item: Any) -> Any:
+        parts = ref.split('.')
+        root = parts.pop(0)
+        if root == '$input':
+            value = self.request.input
+        elif root == '$prev':
+            if index == 0:
+                raise PipelineError(index, "$prev used in the first step")
+            value = outputs[index - 1]
+        elif root == '$steps':
+            if not parts or not parts[0].isdigit() or int(parts[0]) >= index:
+                raise PipelineError(index, f"{ref} must name an earlier step")
+            value = outputs[int(parts.pop(0))]
+        elif root == '$item':
+            if item is None and self.request.steps[index].for_each is None:
+                raise PipelineError(index, "$item used outside a for_each step")
+            value = item
+        else:
+            raise PipelineError(index, f"unknown reference {ref}")
+
+        for part in parts:
+            try:
+                value = value[int(part)] if isinstance(value, (list, tuple)) else value[part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise PipelineError(index, f"{ref} does not exist")
+        return value
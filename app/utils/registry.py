@@ -1,6 +1,20 @@
-from typing import Dict, Type
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Type
 from app.tools.base import BaseTool
 
+logger = logging.getLogger('registry')
+
+# Seconds to wait for a pooled instance before giving up
+POOL_TIMEOUT = float(os.environ.get('DEVTOOLS_POOL_TIMEOUT', '30'))
+
+
+class ToolBusyError(Exception):
+    """Every pooled instance of a tool stayed busy for the whole timeout"""
+
 class ToolRegistry:
     _instance = None
     _tools: Dict[str, Type[BaseTool]] = {}
@@ -9,6 +23,9 @@ class ToolRegistry:
         if not cls._instance:
             cls._instance = super().__new__(cls)
             cls._instance._tools = {}
+            cls._instance._pools = {}
+            cls._instance._members = {}
+            cls._instance._lock = threading.Lock()
         return cls._instance
 
     def register(self, tool_class: Type[BaseTool]) -> None:
@@ -23,4 +40,86 @@ class ToolRegistry:
         """Get all registered tools"""
         return self._tools
 
+    def get_instance(self, name: str) -> Optional[BaseTool]:
+        """Get the shared, set-up instance of a tool (the first one of its pool)"""
+        if not self._ensure_pool(name):
+            return None
+        return self._members[name][0]
+
+    @contextmanager
+    def acquire(self, name: str, timeout: Optional[float] = POOL_TIMEOUT) -> Iterator[BaseTool]:
+        """Borrow a set-up instance of a tool for one execution.
+
+        Tools with pool_size 1 share a single instance; larger pools hand out
+        each instance to one caller at a time and wait up to timeout seconds
+        while all are busy, then raise ToolBusyError.
+        """
+        if not self._ensure_pool(name):
+            raise KeyError(name)
+        pool = self._pools[name]
+        if pool is None:
+            yield self._members[name][0]
+            return
+        try:
+            tool = pool.get(timeout=timeout)
+        except queue.Empty:
+            raise ToolBusyError(f"All {len(self._members[name])} instances of {name} are busy")
+        try:
+            yield tool
+        finally:
+            pool.put(tool)
+
+    def startup(self, names: Optional[List[str]] = None) -> None:
+        """Create and set up instances ahead of the first request"""
+        for name in names or list(self._tools):
+            self._ensure_pool(name)
+
+    def shutdown(self) -> None:
+        """Tear down every instance created so far"""
+        with self._lock:
+            members, self._members, self._pools = self._members, {}, {}
+        for name, instances in members.items():
+            for tool in instances:
+                try:
+                    tool.teardown()
+                except Exception:
+                    logger.exception("Teardown of %s failed", name)
+
+    def health(self) -> Dict[str, bool]:
+        """Run the health check of every instantiated tool"""
+        status = {}
+        for name, instances in list(self._members.items()):
+            try:
+                status[name] = all(tool.health_check() for tool in instances)
+            except Exception:
+                logger.exception("Health check of %s failed", name)
+                status[name] = False
+        return status
+
+    def _ensure_pool(self, name: str) -> bool:
+        if name in self._members:
+            return True
+        tool_class = self._tools.get(name)
+        if tool_class is None:
+            return False
+        with self._lock:
+            if name in self._members:
+                return True
+            size = max(1, tool_class.pool_size)
+            instances = []
+            for _ in range(size):
+                tool = tool_class()
+                tool.setup()
+                instances.append(tool)
+            logger.info("Set up %s instance(s) of %s", size, name)
+            if size > 1:
+                pool = queue.LifoQueue()
+                for tool in instances:
+                    pool.put(tool)
+                self._pools[name] = pool
+            else:
+                self._pools[name] = None
+            self._members[name] = instances
+        return True
+
 registry = ToolRegistry()
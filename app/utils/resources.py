@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Optional, Tuple
+
+from app.tools.base import BaseTool, Budget, ToolResult
+from app.utils.workers import CAN_ISOLATE, execute, over_page_limit, worker_pool
+
+logger = logging.getLogger('resources')
+
+MB = 1024 * 1024
+
+
+def current_rss() -> Optional[int]:
+    """Return the resident set size of this process in bytes, if known"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def input_bytes(tool: BaseTool, params: Dict[str, Any]) -> int:
+    """Size of the params: files named in tool.file_params by size, other values serialized"""
+    total = 0
+    for name, value in params.items():
+        if name in tool.file_params and isinstance(value, (str, os.PathLike)):
+            try:
+                total += os.path.getsize(value)
+            except OSError:
+                pass
+        elif isinstance(value, str):
+            total += len(value.encode('utf-8'))
+        elif isinstance(value, (bytes, bytearray)):
+            total += len(value)
+        elif isinstance(value, (dict, list)):
+            total += len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+    return total
+
+
+def output_bytes(data: Any, output_file: Optional[str] = None) -> int:
+    """Size of a result's data; tools writing to output_file return its path"""
+    if data is None:
+        return 0
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, str):
+        if output_file is not None and data == output_file:
+            try:
+                return os.path.getsize(data)
+            except OSError:
+                return 0
+        return len(data.encode('utf-8'))
+    if hasattr(data, 'getbuffer'):
+        return data.getbuffer().nbytes
+    if hasattr(data, 'seek') and hasattr(data, 'tell'):
+        position = data.tell()
+        size = data.seek(0, os.SEEK_END)
+        data.seek(position)
+        return size
+    return len(json.dumps(data, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def run_metered(tool: BaseTool, params: Dict[str, Any], output_file: Optional[str] = None) -> ToolResult:
+    """Execute a tool within its budget and report what it used in metadata['resources'].
+
+    output_file is passed to tools that can write their result to a file.
+    Only server code picks it; it is deliberately not part of params.
+
+    The input size limit is checked up front. Tools with a timeout or a
+    memory ceiling run in one of the tool's pre-started worker processes (see
+    app.utils.workers), which is killed when it runs out of time or its RSS
+    goes over the ceiling; the server process is never affected. Pages are
+    counted where the tool runs, so the server never parses the input of an
+    isolated tool. Callables in
+    params (e.g. progress callbacks) are relayed from the worker and called in
+    the calling thread.
+    """
+    params = params or {}
+    budget = tool.budget
+    usage: Dict[str, Any] = {'bytes_in': input_bytes(tool, params)}
+
+    if budget.max_input_bytes is not None and usage['bytes_in'] > budget.max_input_bytes:
+        exceeded = 'max_input_bytes'
+    elif budget.isolated and CAN_ISOLATE:
+        result, exceeded = _run_isolated(tool, params, output_file, budget, usage)
+    elif over_page_limit(tool, params, usage):
+        exceeded = 'max_pages'
+    else:
+        result, exceeded = _run_inline(tool, params, output_file, usage)
+    if exceeded is not None:
+        usage['exceeded'] = exceeded
+        logger.warning("%s went over its %s budget", tool.name, exceeded)
+        result = ToolResult(success=False, data=None, message=_exceeded_message(tool, budget, exceeded, usage))
+
+    usage['bytes_out'] = output_bytes(result.data, output_file)
+    logger.debug("%s used %s", tool.name, usage)
+    result.metadata = {**(result.metadata or {}), 'resources': usage}
+    return result
+
+
+def _exceeded_message(tool: BaseTool, budget: Budget, exceeded: str, usage: Dict[str, Any]) -> str:
+    if exceeded == 'max_input_bytes':
+        return f"Input of {usage['bytes_in']} bytes is over the {budget.max_input_bytes}-byte limit of {tool.name}"
+    if exceeded == 'max_pages':
+        return f"{usage['pages']} pages requested, {tool.name} processes at most {budget.max_pages}"
+    if exceeded == 'timeout':
+        return f"{tool.name} did not finish within {budget.timeout:g} seconds and was cancelled"
+    return f"{tool.name} ran out of its {budget.max_memory_mb} MB memory budget and was cancelled"
+
+
+def _run_inline(tool: BaseTool, params: Dict[str, Any], output_file: Optional[str],
+                usage: Dict[str, Any]) -> Tuple[ToolResult, Optional[str]]:
+    # tracemalloc is process wide: its peak includes concurrent executions
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        result = execute(tool, params, output_file)
+    except MemoryError:
+        result = None
+    usage.update(
+        isolated=False,
+        wall_seconds=round(time.perf_counter() - started, 6),
+        cpu_seconds=round(time.thread_time() - cpu_started, 6),
+        rss_mb=_to_mb(current_rss()),
+    )
+    if tracing:
+        usage['traced_peak_mb'] = _to_mb(tracemalloc.get_traced_memory()[1])
+    if result is None:
+        return ToolResult(success=False, data=None), 'max_memory_mb'
+    return result, None
+
+
+def _run_isolated(tool: BaseTool, params: Dict[str, Any], output_file: Optional[str], budget: Budget,
+                  usage: Dict[str, Any]) -> Tuple[ToolResult, Optional[str]]:
+    started = time.perf_counter()
+    outcome = worker_pool(type(tool)).run(params, output_file, budget.timeout, budget.max_memory_mb)
+    usage.update(isolated=True, wall_seconds=round(time.perf_counter() - started, 6), **outcome.usage)
+    if outcome.result is not None:
+        return outcome.result, None
+    if outcome.exceeded is not None:
+        return ToolResult(success=False, data=None), outcome.exceeded
+    return ToolResult(success=False, data=None, message=outcome.error), None
+
+
+def _to_mb(size: Optional[int]) -> Optional[float]:
+    return None if size is None else round(size / MB, 1)
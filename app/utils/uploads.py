@@ -0,0 +1,86 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Web UI uploads unused for this many seconds are deleted
+UPLOAD_MAX_AGE = int(os.environ.get('DEVTOOLS_UPLOAD_MAX_AGE', str(24 * 3600)))
+SWEEP_INTERVAL = 3600
+
+_last_sweep: Dict[str, float] = {}
+_sweep_lock = threading.Lock()
+
+
+def persist_upload(data: bytes, name: str, suffix: str) -> Tuple[str, str]:
+    """Keep an upload in <tempdir>/devtools-<name>/ under its SHA-256 and return (digest, path).
+
+    Identical content maps to the same file, so reruns and other sessions
+    reuse it instead of writing another copy. Files nobody persisted again
+    for UPLOAD_MAX_AGE seconds are swept, so abandoned sessions leave
+    nothing behind.
+    """
+    directory = upload_dir(name)
+    _sweep(directory)
+
+    digest = hashlib.sha256(data).hexdigest()
+    path = os.path.join(directory, digest + suffix)
+    try:
+        # Mark it as used so the sweep keeps it
+        os.utime(path)
+        return digest, path
+    except FileNotFoundError:
+        pass
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return digest, path
+
+
+def upload_dir(name: str) -> str:
+    """The directory uploads for name are kept in, created on first use"""
+    directory = os.path.join(tempfile.gettempdir(), f'devtools-{name}')
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
+
+
+def resolve_input(path: str, name: str, root: Optional[str] = None) -> str:
+    """Resolve an input path a client sent; only files under root or in the upload directory of name may be read.
+
+    Relative paths are taken relative to root. The path is resolved before
+    it is checked, so neither '..' nor a symlink leads out. Raises
+    PermissionError for anything else.
+    """
+    if not isinstance(path, (str, os.PathLike)):
+        raise PermissionError(f"Not a file path: {path!r}")
+    real = os.path.realpath(os.path.join(root, path) if root else path)
+    for allowed in (root, upload_dir(name)):
+        if not allowed:
+            continue
+        allowed = os.path.realpath(allowed)
+        if os.path.commonpath([real, allowed]) == allowed:
+            return real
+    raise PermissionError(f"Reading {path} is not allowed")
+
+
+def _sweep(directory: str) -> None:
+    now = time.time()
+    with _sweep_lock:
+        if now - _last_sweep.get(directory, 0.0) < SWEEP_INTERVAL:
+            return
+        _last_sweep[directory] = now
+    for entry in os.scandir(directory):
+        try:
+            if now - entry.stat().st_mtime > UPLOAD_MAX_AGE:
+                os.unlink(entry.path)
+        except OSError:
+            pass
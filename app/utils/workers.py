@@ -0,0 +1,382 @@
+import atexit
+import functools
+import importlib
+import logging
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+
+from app.tools.base import BaseTool, ToolResult
+from app.utils import log
+
+logger = logging.getLogger('workers')
+
+MB = 1024 * 1024
+
+# Workers are killed together with their subprocesses (e.g. tabula's java
+# fallback) through their process group, which needs POSIX sessions
+CAN_ISOLATE = hasattr(os, 'setsid') and hasattr(os, 'killpg')
+
+# How often a running job's memory is checked
+POLL_INTERVAL = 0.2
+# A worker runs either a tool (a BaseTool subclass, set up once with
+# setup_worker) or a plain module-level function called with each job's params
+Target = Union[Type[BaseTool], Callable[[Dict[str, Any]], Any]]
+
+# Importing the tool and warming it (e.g. starting a JVM) does not count against a job's timeout
+STARTUP_TIMEOUT = float(os.environ.get('DEVTOOLS_WORKER_STARTUP_TIMEOUT', '120'))
+
+
+def execute(tool: BaseTool, params: Dict[str, Any], output_file: Optional[str]) -> ToolResult:
+    if output_file is None:
+        return tool.execute(params)
+    return tool.execute(params, output_file=output_file)
+
+
+def over_page_limit(tool: BaseTool, params: Dict[str, Any], usage: Dict[str, Any]) -> bool:
+    """Count the pages params ask for into usage; True when that is more than the tool's max_pages.
+
+    Counting parses the input, so isolated tools do it in their worker.
+    """
+    if tool.budget.max_pages is None:
+        return False
+    pages = tool.count_pages(params)
+    if pages is None:
+        return False
+    usage['pages'] = pages
+    return pages > tool.budget.max_pages
+
+
+def group_rss(pgid: int) -> Optional[int]:
+    """Resident memory in bytes of every process in a process group, or None without /proc"""
+    total = 0
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    try:
+        pids = [name for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return None
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                stat = f.read()
+        except OSError:
+            # Exited while we were looking
+            continue
+        # Fields after "(comm)": state, ppid, pgrp, ... rss is the 22nd
+        fields = stat[stat.rfind(')') + 2:].split()
+        if int(fields[2]) == pgid:
+            total += int(fields[21]) * page_size
+    return total
+
+
+class JobOutcome:
+    """What one job in a worker came to; exceeded names the budget it went over"""
+
+    def __init__(self, result: Optional[ToolResult] = None, exceeded: Optional[str] = None,
+                 error: Optional[str] = None, usage: Optional[Dict[str, Any]] = None):
+        self.result = result
+        self.exceeded = exceeded
+        self.error = error
+        self.usage = usage or {}
+
+
+def _import_path(target: Callable) -> str:
+    return f'{target.__module__}:{target.__qualname__}'
+
+
+def _resolve(path: str) -> Any:
+    module_name, _, name = path.partition(':')
+    return getattr(importlib.import_module(module_name), name)
+
+
+class Worker:
+    """A fresh interpreter holding one set-up tool or function, running one job at a time.
+
+    It is neither forked from the server (which runs threads and maybe a JVM)
+    nor started through multiprocessing's spawn, which would re-run the
+    server's __main__ module, e.g. the Streamlit script.
+    """
+
+    def __init__(self, target: Target, initializer: Optional[Callable[[], None]] = None):
+        self.name = target.__name__
+        parent_sock, child_sock = socket.socketpair()
+        # The worker imports the target from the same places as this process
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(path for path in sys.path if path)}
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, '-c', 'from app.utils.workers import worker_main; worker_main()',
+                 _import_path(target), str(child_sock.fileno()), str(os.getpid()),
+                 _import_path(initializer) if initializer else ''],
+                pass_fds=(child_sock.fileno(),), env=env,
+                # Lead a process group so that a kill also reaches the subprocesses a job started
+                start_new_session=True,
+            )
+        finally:
+            child_sock.close()
+        self.conn = Connection(parent_sock.detach())
+        self.ready = False
+        self.baseline: Optional[int] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def wait_ready(self) -> bool:
+        if self.ready:
+            return True
+        try:
+            if self.conn.poll(STARTUP_TIMEOUT) and self.conn.recv()[0] == 'ready':
+                self.ready = True
+                self.baseline = group_rss(self.process.pid)
+                return True
+        except (EOFError, OSError):
+            pass
+        logger.error("%s worker did not start (exit code %s)", self.name, self.process.poll())
+        self.kill()
+        return False
+
+    def run(self, params: Dict[str, Any], output_file: Optional[str], timeout: Optional[float],
+            max_memory_mb: Optional[int]) -> JobOutcome:
+        """Run one job; the worker is killed when it runs out of time or memory"""
+        callbacks = {name: value for name, value in params.items() if callable(value)}
+        job = {name: value for name, value in params.items() if name not in callbacks}
+        usage: Dict[str, Any] = {}
+        peak = self.baseline or 0
+        limit = None
+        if max_memory_mb is not None and self.baseline is not None:
+            limit = self.baseline + max_memory_mb * MB
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        # The job's log records carry the request ID of the caller
+        self.conn.send((job, output_file, list(callbacks), log.request_id_var.get()))
+        try:
+            while True:
+                wait = POLL_INTERVAL if limit is not None else None
+                if deadline is not None:
+                    remaining = max(0.0, deadline - time.monotonic())
+                    wait = remaining if wait is None else min(wait, remaining)
+                if self.conn.poll(wait):
+                    message = self.conn.recv()
+                    if message[0] == 'call':
+                        _relay_call(callbacks[message[1]], message[2])
+                        continue
+                    kind, value, usage = message
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.kill()
+                    return JobOutcome(exceeded='timeout', usage=usage)
+                if limit is not None:
+                    rss = group_rss(self.process.pid) or 0
+                    peak = max(peak, rss)
+                    if rss > limit:
+                        self.kill()
+                        return JobOutcome(exceeded='max_memory_mb', usage=_peak(usage, peak))
+        except (EOFError, OSError):
+            # Killed before reporting back, e.g. by the OOM killer
+            self.kill()
+            message = f"{self.name} exited unexpectedly (exit code {self.process.returncode})"
+            return JobOutcome(error=message, usage={'exit_code': self.process.returncode})
+
+        usage = _peak(usage, max(peak, group_rss(self.process.pid) or 0))
+        if kind == 'result':
+            return JobOutcome(result=value, usage=usage)
+        if kind == 'exceeded':
+            return JobOutcome(exceeded=value, usage=usage)
+        return JobOutcome(error=value, usage=usage)
+
+    def kill(self) -> None:
+        # The group outlives a worker that died on its own, e.g. a java subprocess
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Pre-started workers for one tool class or function, replaced when killed or bloated"""
+
+    def __init__(self, target: Target, size: int, initializer: Optional[Callable[[], None]] = None):
+        self.target = target
+        self.initializer = initializer
+        self.size = size
+        self._idle: 'queue.LifoQueue[Optional[Worker]]' = queue.LifoQueue()
+        for _ in range(size):
+            # Placeholders are replaced by a fresh worker when borrowed
+            self._idle.put(None)
+        self._workers: List[Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        """Start every worker now so that the first jobs do not wait for warm-up"""
+        spares = []
+        while True:
+            try:
+                spares.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in spares:
+            self._idle.put(worker if worker is not None else self._spawn())
+
+    def run(self, params: Dict[str, Any], output_file: Optional[str], timeout: Optional[float],
+            max_memory_mb: Optional[int]) -> JobOutcome:
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.alive:
+                worker = self._spawn()
+            if not worker.wait_ready():
+                return JobOutcome(error=f"{self.target.__name__} worker failed to start")
+            outcome = worker.run(params, output_file, timeout, max_memory_mb)
+            if worker.alive and max_memory_mb is not None and worker.baseline is not None:
+                # Memory freed by Python is rarely returned to the OS; retire a worker
+                # that kept a lot of it so the next job gets its whole budget
+                idle_rss = group_rss(worker.process.pid) or 0
+                if idle_rss > worker.baseline + max_memory_mb * MB // 2:
+                    logger.info("Retiring %s worker holding %s MB", self.target.__name__, idle_rss // MB)
+                    worker.kill()
+            return outcome
+        finally:
+            self._idle.put(worker if worker is not None and worker.alive and not self._closed else None)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.kill()
+
+    def _spawn(self) -> Worker:
+        worker = Worker(self.target, self.initializer)
+        with self._lock:
+            self._workers = [w for w in self._workers if w.alive]
+            self._workers.append(worker)
+        return worker
+
+
+_pools: Dict[Target, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def worker_pool(target: Target, size: Optional[int] = None,
+                initializer: Optional[Callable[[], None]] = None) -> WorkerPool:
+    """The pool of workers for target, created on first use.
+
+    Tools get tool_class.pool_size workers. A function must be defined at
+    module level; it is called with each job's params and returns the job's
+    result, after initializer (if given) ran once in the worker.
+    """
+    with _pools_lock:
+        pool = _pools.get(target)
+        if pool is None:
+            if size is None:
+                size = target.pool_size
+            pool = _pools[target] = WorkerPool(target, max(1, size), initializer)
+        return pool
+
+
+def shutdown_pool(target: Target) -> None:
+    with _pools_lock:
+        pool = _pools.pop(target, None)
+    if pool is not None:
+        pool.shutdown()
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """Kill every worker; each runs in its own session, so they would outlive this process"""
+    for target in list(_pools):
+        shutdown_pool(target)
+
+
+def _peak(usage: Dict[str, Any], peak: int) -> Dict[str, Any]:
+    if peak:
+        usage = {**usage, 'peak_rss_mb': round(peak / MB, 1)}
+    return usage
+
+
+def _relay_call(callback: Callable, args: tuple) -> None:
+    try:
+        callback(*args)
+    except Exception:
+        logger.exception("Relayed callback failed")
+
+
+def _send_call(conn, name: str, *args) -> None:
+    conn.send(('call', name, args))
+
+
+def _cpu_seconds() -> float:
+    import resource
+    # Children cover subprocesses such as tabula's java fallback
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _exit_with_server(server_pid: int) -> None:
+    """Kill this worker's process group once the server process that started it is gone.
+
+    A server process killed with SIGKILL, e.g. after the graceful timeout,
+    cannot shut its workers down, and they run in sessions of their own.
+    """
+    while os.getppid() == server_pid:
+        time.sleep(1)
+    os.killpg(os.getpid(), signal.SIGKILL)
+
+
+def _run_tool(tool: BaseTool, params: Dict[str, Any], output_file: Optional[str],
+              usage: Dict[str, Any]) -> Tuple[str, Any]:
+    if over_page_limit(tool, params, usage):
+        return 'exceeded', 'max_pages'
+    return 'result', execute(tool, params, output_file)
+
+
+def worker_main() -> None:
+    """Body of a worker process: set the target up once, then run jobs until the connection closes"""
+    # The DEVTOOLS_LOG_* settings reach the worker through its environment
+    log.configure_logging()
+    target_path, fd, server_pid, initializer_path = sys.argv[1:5]
+    threading.Thread(target=_exit_with_server, args=(int(server_pid),), daemon=True).start()
+    target = _resolve(target_path)
+    conn = Connection(int(fd))
+    teardown = None
+    if isinstance(target, type) and issubclass(target, BaseTool):
+        tool = target()
+        tool.setup_worker()
+        run = functools.partial(_run_tool, tool)
+        teardown = tool.teardown
+    else:
+        if initializer_path:
+            _resolve(initializer_path)()
+        run = lambda params, output_file, usage: ('result', target(params))
+    conn.send(('ready',))
+    while True:
+        try:
+            params, output_file, callback_names, request_id = conn.recv()
+        except (EOFError, OSError):
+            break
+        log.request_id_var.set(request_id)
+        for name in callback_names:
+            params[name] = functools.partial(_send_call, conn, name)
+        cpu_started = _cpu_seconds()
+        usage: Dict[str, Any] = {}
+        try:
+            outcome = run(params, output_file, usage)
+        except MemoryError:
+            outcome = ('exceeded', 'max_memory_mb')
+        except Exception as e:
+            logger.exception("Isolated execution of %s failed", target.__name__)
+            outcome = ('error', f"{target.__name__} failed: {e}")
+        usage['cpu_seconds'] = round(_cpu_seconds() - cpu_started, 6)
+        conn.send(outcome + (usage,))
+    if teardown is not None:
+        teardown()
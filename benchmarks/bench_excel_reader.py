@@ -0,0 +1,109 @@
+"""Compare ExcelReaderTool with pandas.read_excel on a large sheet.
+
+Usage:
+    python benchmarks/bench_excel_reader.py --rows 1000000 --cols 10
+
+Each reader runs in its own child process so the peak RSS reported for one
+does not include memory left behind by the other.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def make_workbook(path: str, rows: int, cols: int) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append([f"col{c}" for c in range(cols)])
+    for r in range(rows):
+        sheet.append([r if c % 2 == 0 else f"value {r}-{c}" for c in range(cols)])
+    workbook.save(path)
+
+
+def run_excel_reader(path: str, output_format: str) -> str:
+    from app.tools.core import excel_reader
+    from app.tools.core.excel_reader import ExcelReaderTool
+
+    # The tool only reads workbooks below its root
+    excel_reader.EXCEL_ROOT = os.path.dirname(os.path.abspath(path))
+    fd, output = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        result = ExcelReaderTool().execute({"excel_file": path, "output_format": output_format}, output_file=output)
+        if not result.success:
+            raise RuntimeError(result.message)
+        return f"{result.metadata['sheets'][0]['rows']} rows"
+    finally:
+        os.remove(output)
+
+
+def run_pandas(path: str, output_format: str) -> str:
+    import pandas as pd
+
+    frame = pd.read_excel(path, engine="openpyxl")
+    fd, output = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        if output_format == "csv":
+            frame.to_csv(output, index=False)
+        else:
+            frame.to_json(output, orient="records", lines=output_format == "ndjson")
+        return f"{len(frame)} rows"
+    finally:
+        os.remove(output)
+
+
+def _child(target, path, output_format, conn):
+    started = time.perf_counter()
+    summary = target(path, output_format)
+    conn.send((time.perf_counter() - started, summary))
+
+
+def measure(target, path: str, output_format: str):
+    """Run target in a fresh process and return (seconds, peak RSS in MB, summary)"""
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(target, path, output_format, child))
+    process.start()
+    seconds, summary = parent.recv()
+    process.join()
+    # ru_maxrss is the largest child seen so far, so measure the lighter reader first
+    peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    return seconds, peak_kb / 1024, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--format", choices=["csv", "ndjson", "json"], default="csv")
+    parser.add_argument("--workbook", help="Reuse an existing workbook instead of generating one")
+    args = parser.parse_args()
+
+    path = args.workbook
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"bench_{args.rows}x{args.cols}.xlsx")
+        if not os.path.exists(path):
+            print(f"Generating {path} ...")
+            started = time.perf_counter()
+            make_workbook(path, args.rows, args.cols)
+            print(f"  {time.perf_counter() - started:.1f}s, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+    print(f"{'reader':<16}{'seconds':>10}{'peak MB':>10}  result")
+    for name, target in (("ExcelReaderTool", run_excel_reader), ("pd.read_excel", run_pandas)):
+        seconds, peak_mb, summary = measure(target, path, args.format)
+        print(f"{name:<16}{seconds:>10.1f}{peak_mb:>10.0f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import os
 import sys
 import logging
+import argparse
 from pathlib import Path
 import uvicorn
 
@@ -9,23 +11,75 @@ project_root = Path(__file__).parent.absolute()
 # Add the project root to the path
 sys.path.append(str(project_root))
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("api.log"),
-        logging.StreamHandler()
-    ]
-)
+from app.utils.log import configure_logging
+
+APP = "app.api.routes:app"
+
+
+def parse_args(argv=None):
+    """Parse launcher options, falling back to DEVTOOLS_* environment variables"""
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="DevTools Hub API server")
+    parser.add_argument("--mode", choices=["dev", "prod"], default=env("DEVTOOLS_MODE", "dev"),
+                        help="dev: single process with auto-reload; prod: pre-forked workers")
+    parser.add_argument("--host", default=env("DEVTOOLS_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(env("DEVTOOLS_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(env("DEVTOOLS_WORKERS", str(os.cpu_count() or 1))),
+                        help="Number of worker processes (prod mode)")
+    parser.add_argument("--max-requests", type=int, default=int(env("DEVTOOLS_MAX_REQUESTS", "0")),
+                        help="Recycle a worker after this many requests (0 disables)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(env("DEVTOOLS_MAX_REQUESTS_JITTER", "0")),
+                        help="Random extra requests per worker so workers do not recycle together")
+    parser.add_argument("--max-memory-mb", type=int, default=int(env("DEVTOOLS_MAX_MEMORY_MB", "0")),
+                        help="Recycle a worker once its RSS exceeds this many MB (0 disables)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(env("DEVTOOLS_GRACEFUL_TIMEOUT", "30")),
+                        help="Seconds to drain in-flight requests on shutdown")
+    parser.add_argument("--log-level", default=env("DEVTOOLS_LOG_LEVEL", "info"))
+    parser.add_argument("--log-file", default=env("DEVTOOLS_LOG_FILE", "api.log"),
+                        help="Also write logs to this file (empty disables)")
+    parser.add_argument("--log-json", action="store_true",
+                        default=env("DEVTOOLS_LOG_JSON", "").lower() in ("1", "true", "yes"),
+                        help="Emit one JSON object per log line")
+    parser.add_argument("--debug-sample-rate", type=float,
+                        default=float(env("DEVTOOLS_LOG_DEBUG_SAMPLE_RATE", "1.0")),
+                        help="Fraction of repeated DEBUG records to keep")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    logging.info("Starting DevTools Hub API server")
-    # Run the FastAPI server
-    uvicorn.run(
-        "app.api.routes:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True,
-        log_level="info"
-    )
+    args = parse_args()
+
+    # Export the logging options so reloaded and spawned workers pick them up
+    os.environ["DEVTOOLS_LOG_LEVEL"] = args.log_level
+    os.environ["DEVTOOLS_LOG_FILE"] = args.log_file
+    os.environ["DEVTOOLS_LOG_JSON"] = "1" if args.log_json else ""
+    os.environ["DEVTOOLS_LOG_DEBUG_SAMPLE_RATE"] = str(args.debug_sample_rate)
+    # Per-process pools (e.g. CryptoTool's) split the CPUs between the server workers
+    os.environ["DEVTOOLS_WORKERS"] = str(args.workers if args.mode == "prod" else 1)
+    configure_logging()
+
+    logging.info("Starting DevTools Hub API server in %s mode", args.mode)
+    if args.mode == "prod":
+        from app.server import PreforkServer
+
+        PreforkServer(
+            APP,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            max_memory_mb=args.max_memory_mb,
+            graceful_timeout=args.graceful_timeout,
+            log_level=args.log_level,
+        ).run()
+    else:
+        # Run the FastAPI server
+        uvicorn.run(
+            APP,
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level=args.log_level,
+            log_config=None
+        )
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import encoding, routes
+from app.api.encoding import ResponseEncoder
+
+FORMAT = {'input_data': '{"b": 1, "a": [1, 2, 3]}'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Tools are set up lazily on first use, so the lifespan (which warms every tool) is not needed
+    for name in ('msgpack', 'zstandard', 'brotli'):
+        monkeypatch.setattr(encoding, name, None)
+    monkeypatch.setattr(routes, 'response_encoder', ResponseEncoder(min_bytes=1))
+    routes.response_cache.clear()
+    routes.response_cache.hits = routes.response_cache.misses = 0
+    yield TestClient(routes.app)
+    routes.response_cache.clear()
+
+
+def test_second_request_is_served_from_cache(client):
+    first = client.post('/tools/JSONTool', json=FORMAT)
+    second = client.post('/tools/JSONTool', json={'a': None, **FORMAT})
+    third = client.post('/tools/JSONTool', json=dict(reversed(list(FORMAT.items()))))
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'MISS'
+    assert third.headers['X-Cache'] == 'HIT'
+    assert third.json() == first.json()
+    assert third.headers['ETag'] == first.headers['ETag']
+
+
+def test_matching_etag_gets_304(client):
+    etag = client.post('/tools/JSONTool', json=FORMAT).headers['ETag']
+
+    response = client.post('/tools/JSONTool', json=FORMAT, headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['ETag'] == etag
+    assert client.post('/tools/JSONTool', json=FORMAT, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_non_deterministic_tools_bypass_the_cache(client):
+    params = {'input_data': 'hello', 'algorithm': 'Base64', 'mode': 'encrypt'}
+
+    responses = [client.post('/tools/CryptoTool', json=params) for _ in range(2)]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all('X-Cache' not in response.headers and 'ETag' not in response.headers for response in responses)
+    assert routes.response_cache.stats()['entries'] == 0
+
+
+def test_each_encoding_is_cached_with_its_own_etag(client):
+    plain = client.post('/tools/JSONTool', json=FORMAT, headers={'Accept-Encoding': 'identity'})
+    gzipped = client.post('/tools/JSONTool', json=FORMAT, headers={'Accept-Encoding': 'gzip'})
+    again = client.post('/tools/JSONTool', json=FORMAT, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzipped.json() == plain.json()
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+    assert again.headers['ETag'] == gzipped.headers['ETag']
+    assert gzipped.headers['Vary'] == 'Accept, Accept-Encoding'
+    assert routes.response_cache.stats()['entries'] == 2
+
+
+def test_missing_codecs_fall_back(client):
+    response = client.post('/tools/JSONTool', json=FORMAT,
+                           headers={'Accept': 'application/msgpack', 'Accept-Encoding': 'zstd, br'})
+
+    assert response.headers['Content-Type'] == 'application/json'
+    assert 'Content-Encoding' not in response.headers
+    assert response.json()['success']
+
+
+def test_metrics_count_one_lookup_per_request(client):
+    for accept_encoding in ('gzip', 'gzip', 'identity'):
+        client.post('/tools/JSONTool', json=FORMAT, headers={'Accept-Encoding': accept_encoding})
+
+    cache = client.get('/metrics').json()['cache']
+
+    assert (cache['hits'], cache['misses']) == (2, 1)
+
+
+def test_uncached_results_are_compressed(client):
+    params = {'input_data': 'x' * 2000, 'algorithm': 'Base64', 'mode': 'encrypt'}
+
+    response = client.post('/tools/CryptoTool', json=params, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.json()['success']
+
+
+def test_msgpack_variant_is_cached_next_to_json(client, monkeypatch):
+    monkeypatch.setattr(encoding, 'msgpack', SimpleNamespace(packb=lambda value: b'packed'))
+    headers = {'Accept': 'application/msgpack', 'Accept-Encoding': 'identity'}
+
+    first = client.post('/tools/JSONTool', json=FORMAT, headers=headers)
+    second = client.post('/tools/JSONTool', json=FORMAT, headers=headers)
+
+    assert first.headers['Content-Type'] == 'application/msgpack'
+    assert first.content == b'packed'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert routes.response_cache.stats()['entries'] == 2
@@ -0,0 +1,85 @@
+import time
+
+from app.utils.cache import ResponseCache, cache_key, etag_matches, make_etag
+
+
+def test_cache_key_ignores_param_order():
+    assert cache_key('JSONTool', {'a': 1, 'b': [1, 2]}) == cache_key('JSONTool', {'b': [1, 2], 'a': 1})
+
+
+def test_cache_key_depends_on_tool_and_values():
+    key = cache_key('JSONTool', {'a': 1})
+
+    assert key != cache_key('URLEncoder', {'a': 1})
+    assert key != cache_key('JSONTool', {'a': 2})
+    assert key != cache_key('JSONTool', {'a': '1'})
+
+
+def test_get_counts_hits_and_misses():
+    cache = ResponseCache()
+    cache.set('k', b'body')
+
+    assert cache.get('k').body == b'body'
+    assert cache.get('other') is None
+    assert cache.stats() == {'entries': 1, 'bytes': 4, 'hits': 1, 'misses': 1}
+
+
+def test_peek_does_not_count():
+    cache = ResponseCache()
+    cache.set('k', b'body')
+
+    assert cache.peek('k').body == b'body'
+    assert cache.peek('other') is None
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResponseCache(ttl=10)
+    cache.set('k', b'body')
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 11)
+
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', b'1')
+    cache.set('b', b'2')
+    cache.get('a')
+    cache.set('c', b'3')
+
+    assert cache.peek('a') is not None
+    assert cache.peek('b') is None
+
+
+def test_size_bound():
+    cache = ResponseCache(max_bytes=10)
+    cache.set('a', b'12345')
+    cache.set('b', b'123456')
+    cache.set('huge', b'x' * 11)
+
+    assert cache.peek('a') is None
+    assert cache.peek('b') is not None
+    assert cache.peek('huge') is None
+    assert cache.stats()['bytes'] == 6
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(ttl=0)
+    entry = cache.set('k', b'body')
+
+    assert not cache.enabled
+    assert entry.etag == make_etag(b'body')
+    assert cache.peek('k') is None
+
+
+def test_etag_matches():
+    etag = make_etag(b'body')
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,100 @@
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import encoding
+from app.api.encoding import JSON, MSGPACK, ResponseEncoder, Variant, parse_qvalues
+
+
+@pytest.fixture
+def fake_msgpack(monkeypatch):
+    monkeypatch.setattr(encoding, 'msgpack', SimpleNamespace(packb=lambda value: b'packed:' + json.dumps(value).encode()))
+
+
+@pytest.fixture
+def fake_zstd(monkeypatch):
+    compressor = SimpleNamespace(compress=lambda data: b'zstd:' + data)
+    monkeypatch.setattr(encoding, 'zstandard', SimpleNamespace(ZstdCompressor=lambda level: compressor))
+
+
+@pytest.fixture
+def no_optional_codecs(monkeypatch):
+    for name in ('msgpack', 'zstandard', 'brotli'):
+        monkeypatch.setattr(encoding, name, None)
+
+
+def test_parse_qvalues():
+    assert parse_qvalues('gzip;q=0.8, br ,zstd;q=x,') == {'gzip': 0.8, 'br': 1.0, 'zstd': 0.0}
+    assert parse_qvalues(None) == {}
+
+
+def test_json_without_accept_headers(no_optional_codecs):
+    assert ResponseEncoder().negotiate({}) == Variant(JSON, None)
+
+
+def test_msgpack_when_preferred(fake_msgpack):
+    encoder = ResponseEncoder()
+
+    assert encoder.negotiate({'accept': 'application/msgpack'}).media_type == MSGPACK
+    assert encoder.negotiate({'accept': 'application/x-msgpack, application/json;q=0.5'}).media_type == MSGPACK
+    assert encoder.negotiate({'accept': 'application/json, application/msgpack;q=0.5'}).media_type == JSON
+    assert encoder.negotiate({'accept': 'application/msgpack;q=0'}).media_type == JSON
+
+
+def test_msgpack_falls_back_to_json_when_missing(no_optional_codecs):
+    encoder = ResponseEncoder()
+
+    assert encoder.media_types == (JSON,)
+    assert encoder.negotiate({'accept': 'application/msgpack'}).media_type == JSON
+
+
+def test_encoding_follows_qvalues_then_preference(fake_zstd, monkeypatch):
+    monkeypatch.setattr(encoding, 'brotli', None)
+    encoder = ResponseEncoder()
+
+    assert encoder.encodings == ('zstd', 'gzip')
+    assert encoder.negotiate({'accept-encoding': 'gzip, zstd'}).encoding == 'zstd'
+    assert encoder.negotiate({'accept-encoding': 'gzip, zstd;q=0.5'}).encoding == 'gzip'
+    assert encoder.negotiate({'accept-encoding': '*'}).encoding == 'zstd'
+    assert encoder.negotiate({'accept-encoding': 'identity'}).encoding is None
+
+
+def test_zstd_falls_back_when_missing(no_optional_codecs):
+    encoder = ResponseEncoder()
+
+    assert encoder.encodings == ('gzip',)
+    assert encoder.negotiate({'accept-encoding': 'zstd, br'}).encoding is None
+    assert encoder.negotiate({'accept-encoding': 'zstd, gzip;q=0.1'}).encoding == 'gzip'
+
+
+def test_compression_can_be_disabled(no_optional_codecs):
+    assert ResponseEncoder(min_bytes=0).negotiate({'accept-encoding': 'gzip'}).encoding is None
+
+
+def test_small_bodies_are_not_compressed(no_optional_codecs):
+    encoder = ResponseEncoder(min_bytes=100)
+    small = encoder.encode(Variant(JSON, 'gzip'), json_body=b'{}')
+    large_body = json.dumps({'a': 'x' * 200}).encode()
+    large = encoder.encode(Variant(JSON, 'gzip'), json_body=large_body)
+
+    assert (small.body, small.encoding) == (b'{}', None)
+    assert large.encoding == 'gzip'
+    assert gzip.decompress(large.body) == large_body
+    assert large.headers() == {'Content-Type': JSON, 'X-Uncompressed-Length': str(len(large_body)),
+                               'Content-Encoding': 'gzip'}
+
+
+def test_gzip_output_is_stable(no_optional_codecs):
+    encoder = ResponseEncoder(min_bytes=1)
+    body = b'{"a": 1}' * 50
+
+    assert encoder.encode(Variant(JSON, 'gzip'), body).body == encoder.encode(Variant(JSON, 'gzip'), body).body
+
+
+def test_msgpack_body(fake_msgpack):
+    encoded = ResponseEncoder().encode(Variant(MSGPACK, None), json_body=b'{"a": 1}')
+
+    assert encoded.body == b'packed:{"a": 1}'
+    assert encoded.media_type == MSGPACK
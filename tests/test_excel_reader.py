@@ -0,0 +1,95 @@
+import json
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+
+from app.api import routes
+from app.tools.core import excel_reader
+from app.tools.core.excel_reader import ExcelReaderTool
+from app.utils.uploads import upload_dir
+
+
+@pytest.fixture(autouse=True)
+def isolated_tempdir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    (tmp_path / 'tmp').mkdir()
+    monkeypatch.setattr(excel_reader, 'EXCEL_ROOT', None)
+
+
+def make_workbook(path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Data'
+    sheet.append(['name', 'amount'])
+    sheet.append(['Alice', 10])
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def uploaded():
+    return make_workbook(f"{upload_dir('excel')}/book.xlsx")
+
+
+def test_converts_an_upload(uploaded):
+    result = ExcelReaderTool().execute({'excel_file': uploaded, 'output_format': 'json'})
+
+    assert result.success
+    assert json.loads(result.data.read()) == {'Data': [{'name': 'Alice', 'amount': 10}]}
+
+
+@pytest.mark.parametrize('params', [
+    {'range': 5},
+    {'sheets': {'name': 'Data'}},
+    {'sheets': [True]},
+    {'header': 'yes'},
+    {'skip_empty': 'no'},
+    {'output_format': ['csv']},
+])
+def test_params_of_the_wrong_type_are_errors(uploaded, params):
+    result = ExcelReaderTool().execute({'excel_file': uploaded, **params})
+
+    assert not result.success
+    assert result.message
+
+
+def test_bad_range_is_an_error_with_an_output_file(uploaded, tmp_path):
+    output = tmp_path / 'out.csv'
+    result = ExcelReaderTool().execute({'excel_file': uploaded, 'range': '!!'}, output_file=str(output))
+
+    assert not result.success
+    assert 'Invalid range' in result.message
+
+
+def test_server_paths_need_a_root(tmp_path, monkeypatch):
+    path = make_workbook(tmp_path / 'book.xlsx')
+
+    assert not ExcelReaderTool().execute({'excel_file': path}).success
+
+    monkeypatch.setattr(excel_reader, 'EXCEL_ROOT', str(tmp_path))
+    assert ExcelReaderTool().execute({'excel_file': 'book.xlsx'}).success
+
+
+def test_convert_endpoint_reports_metadata_and_reads_the_range_field(tmp_path):
+    client = TestClient(routes.app)
+    with open(make_workbook(tmp_path / 'book.xlsx'), 'rb') as workbook:
+        response = client.post('/excel/convert', files={'file': ('book.xlsx', workbook)},
+                               data={'output_format': 'json', 'range': 'A2:B2', 'header': 'false'})
+
+    assert response.status_code == 200
+    assert response.json() == {'Data': [{'A': 'Alice', 'B': 10}]}
+    metadata = json.loads(response.headers['X-Conversion-Metadata'])
+    assert metadata['sheets'][0]['name'] == 'Data'
+    assert metadata['sheets'][0]['rows'] == 1
+    assert 'wall_seconds' in metadata['resources']
+
+
+def test_metadata_header_leaves_out_large_lists(monkeypatch):
+    monkeypatch.setattr(routes, 'METADATA_HEADER_LIMIT', 200)
+    metadata = {'pages': [{'page': n, 'method': 'lattice'} for n in range(50)], 'resources': {'wall_seconds': 1.5}}
+
+    header = json.loads(routes._metadata_header(metadata))
+
+    assert header == {'resources': {'wall_seconds': 1.5}, 'omitted': ['pages']}
@@ -0,0 +1,184 @@
+import json
+import os
+
+import pytest
+
+from app.tools.core import json_index
+from app.tools.core.json_index import build_index, open_index, parse_path
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    """Save indexes under tmp_path and start every test without open indexes"""
+    directory = tmp_path / 'indexes'
+    monkeypatch.setattr(json_index, 'INDEX_DIR', str(directory))
+    json_index._open_indexes.clear()
+    yield directory
+    json_index._open_indexes.clear()
+
+
+def write_json(tmp_path, text, name='data.json'):
+    path = tmp_path / name
+    path.write_bytes(text.encode('utf-8'))
+    return str(path)
+
+
+def query(path, expression, max_depth=json_index.DEFAULT_DEPTH, limit=None):
+    index, _ = open_index(path, max_depth)
+    return index.query(expression, limit)[0]
+
+
+def test_brackets_and_escaped_quotes_inside_strings(tmp_path):
+    document = {
+        'a': 'closing ] and } inside',
+        'b': 'escaped \\" quote, then [{',
+        'c"]': [1, '\\'],
+        'd': {'e': 'x}'},
+    }
+    path = write_json(tmp_path, json.dumps(document))
+
+    assert query(path, '$.a') == [document['a']]
+    assert query(path, '$.b') == [document['b']]
+    assert query(path, "$['c\"]'][1]") == ['\\']
+    assert query(path, '$.d.e') == ['x}']
+    assert query(path, '$.*') == list(document.values())
+
+
+def test_index_spans_skip_strings_with_brackets():
+    buf = b'{"k": "]", "l": ["[", {"m": "}"}], "n": 1}'
+    root = build_index(buf, max_depth=1)
+
+    assert sorted(root['k']) == ['k', 'l', 'n']
+    start, end = root['k']['l']
+    assert json.loads(buf[start:end]) == ['[', {'m': '}'}]
+
+
+def test_empty_containers(tmp_path):
+    path = write_json(tmp_path, '{"o": {}, "a": [], "nested": [[], {}], "empty_key": {"": []}}')
+
+    assert query(path, '$.o') == [{}]
+    assert query(path, '$.a') == [[]]
+    assert query(path, '$.a[*]') == []
+    assert query(path, '$.nested[*]') == [[], {}]
+    assert query(path, "$.empty_key['']") == [[]]
+
+
+def test_empty_root_containers():
+    assert build_index(b'[]') == {'a': [0, 2], 'i': []}
+    assert build_index(b' { } ') == {'o': [1, 4], 'k': {}}
+
+
+def test_bare_scalar(tmp_path):
+    assert build_index(b'  42 ') == [2, 5]
+    path = write_json(tmp_path, ' "just a string" ')
+
+    assert query(path, '$') == ['just a string']
+    assert query(path, '$.anything') == []
+    assert query(path, '$[0]') == []
+
+
+def test_unbalanced_document_is_rejected():
+    with pytest.raises(ValueError):
+        build_index(b'{"a": [1, 2}')
+    with pytest.raises(ValueError):
+        build_index(b'{"a": [1, 2]')
+
+
+def test_deeper_containers_are_kept_as_spans():
+    buf = b'{"a": {"b": {"c": 1}}}'
+
+    shallow = build_index(buf, max_depth=1)
+    start, end = shallow['k']['a']
+    assert json.loads(buf[start:end]) == {'b': {'c': 1}}
+
+    deep = build_index(buf, max_depth=2)['k']['a']
+    start, end = deep['k']['b']
+    assert json.loads(buf[slice(*deep['o'])]) == {'b': {'c': 1}}
+    assert json.loads(buf[start:end]) == {'c': 1}
+
+
+def test_queries_match_json_loads(tmp_path):
+    document = {'store': {'book': [{'title': f'T{i}', 'price': i} for i in range(5)]}, 'owner': 'x'}
+    path = write_json(tmp_path, json.dumps(document))
+
+    assert query(path, '$.store.book[1:4].title') == ['T1', 'T2', 'T3']
+    assert query(path, '$.store.book[-1].price') == [4]
+    assert query(path, '$.store.book[0,2].title') == ['T0', 'T2']
+    assert query(path, '$..price') == [0, 1, 2, 3, 4]
+    assert query(path, '$..title', limit=2) == ['T0', 'T1']
+
+
+def test_limit_reports_truncation(tmp_path):
+    path = write_json(tmp_path, json.dumps(list(range(10))))
+    index, _ = open_index(path)
+
+    assert index.query('$[*]', limit=3) == ([0, 1, 2], True)
+    assert index.query('$[*]', limit=10) == (list(range(10)), False)
+
+
+def test_large_values_get_lazy_sub_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_index, 'LAZY_INDEX_MIN_BYTES', 64)
+    document = {'small': {'x': 1}, 'large': {f'key{i}': [i] * 5 for i in range(20)}}
+    path = write_json(tmp_path, json.dumps(document))
+    index, _ = open_index(path)
+
+    assert index.sub_indexes == {}
+    assert query(path, '$.small.x') == [1]
+    assert index.sub_indexes == {}
+
+    assert query(path, '$.large.key7') == [[7] * 5]
+    start = index.root['k']['large'][0]
+    assert list(index.sub_indexes) == [start]
+    assert sorted(index.sub_indexes[start]['k']) == sorted(document['large'])
+    # Expanded once, then reused
+    assert query(path, '$.large.key19[0]') == [19]
+    assert list(index.sub_indexes) == [start]
+
+
+def test_reload_from_saved_index(tmp_path, index_dir, monkeypatch):
+    monkeypatch.setattr(json_index, 'LAZY_INDEX_MIN_BYTES', 64)
+    document = {'a': [1, 2, 3], 'large': {f'key{i}': 'v' * 10 for i in range(20)}}
+    path = write_json(tmp_path, json.dumps(document))
+
+    index, built = open_index(path)
+    assert built
+    assert query(path, '$.large.key3') == ['v' * 10]
+    assert len(os.listdir(index_dir)) == 1
+    # Nothing is written next to the queried file
+    assert sorted(os.listdir(tmp_path)) == ['data.json', 'indexes']
+
+    json_index._open_indexes.clear()
+    reloaded, built = open_index(path)
+    assert not built
+    assert reloaded is not index
+    assert reloaded.root == index.root
+    assert reloaded.sub_indexes == index.sub_indexes
+    assert query(path, '$.a[2]') == [3]
+
+
+def test_cached_index_reports_not_built(tmp_path):
+    path = write_json(tmp_path, '{"a": 1}')
+
+    assert open_index(path)[1]
+    assert not open_index(path)[1]
+
+
+def test_changed_file_is_rescanned(tmp_path):
+    path = write_json(tmp_path, '{"a": 1}')
+    open_index(path)
+    json_index._open_indexes.clear()
+
+    write_json(tmp_path, '{"a": 2, "b": 3}')
+    index, built = open_index(path)
+
+    assert built
+    assert index.query('$.b')[0] == [3]
+
+
+def test_parse_path():
+    assert parse_path('$.a[0]["b c"][1:3][*]..d') == [
+        ('key', 'a'), ('index', 0), ('key', 'b c'), ('slice', 1, 3), ('wildcard',), ('descend', ('key', 'd')),
+    ]
+    assert parse_path("$['x', 2]") == [('union', [('key', 'x'), ('index', 2)])]
+    with pytest.raises(ValueError):
+        parse_path('$.a[')
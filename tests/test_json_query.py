@@ -0,0 +1,67 @@
+import json
+import tempfile
+
+import pytest
+
+from app.tools.core import json_index, json_query
+from app.tools.core.json_query import JSONQueryTool
+from app.utils.uploads import persist_upload
+
+
+@pytest.fixture(autouse=True)
+def isolated_dirs(tmp_path, monkeypatch):
+    """Keep uploads and saved indexes under tmp_path"""
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    (tmp_path / 'tmp').mkdir()
+    monkeypatch.setattr(json_index, 'INDEX_DIR', str(tmp_path / 'indexes'))
+    monkeypatch.setattr(json_query, 'JSON_ROOT', None)
+    json_index._open_indexes.clear()
+    yield
+    json_index._open_indexes.clear()
+
+
+def run(file, query='$.secret'):
+    return JSONQueryTool().execute({'file': file, 'query': query})
+
+
+@pytest.fixture
+def secret_file(tmp_path):
+    path = tmp_path / 'outside' / 'secret.json'
+    path.parent.mkdir()
+    path.write_text(json.dumps({'secret': 's3cr3t'}))
+    return path
+
+
+def test_server_paths_are_refused_without_a_root(secret_file):
+    result = run(str(secret_file))
+
+    assert not result.success
+    assert 's3cr3t' not in json.dumps(result.data)
+
+
+def test_uploads_can_be_queried():
+    _, path = persist_upload(json.dumps({'secret': 'mine'}).encode('utf-8'), 'json', '.json')
+
+    result = run(path)
+
+    assert result.success
+    assert result.data['matches'] == ['mine']
+
+
+def test_files_under_the_root_can_be_queried(tmp_path, monkeypatch, secret_file):
+    monkeypatch.setattr(json_query, 'JSON_ROOT', str(secret_file.parent))
+
+    assert run(str(secret_file)).data['matches'] == ['s3cr3t']
+    assert run('secret.json').data['matches'] == ['s3cr3t']
+
+
+def test_paths_leading_out_of_the_root_are_refused(tmp_path, monkeypatch, secret_file):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'link.json').symlink_to(secret_file)
+    monkeypatch.setattr(json_query, 'JSON_ROOT', str(root))
+
+    assert not run('../outside/secret.json').success
+    assert not run(str(secret_file)).success
+    assert not run('link.json').success
+    assert not run(5).success
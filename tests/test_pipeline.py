@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.tools.base import BaseTool, ToolResult
+from app.utils.pipeline import Pipeline, PipelineRequest
+from app.utils.registry import registry
+
+
+class StubRegistry:
+    def __init__(self, *names):
+        self.names = names
+
+    def get_tool(self, name):
+        return object() if name in self.names else None
+
+
+class Recorder:
+    """A step runner answering for two fake tools and logging every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, tool_name, params):
+        self.calls.append((tool_name, params))
+        if tool_name == 'fail':
+            return ToolResult(success=False, data=None, message='boom')
+        if tool_name == 'split':
+            return ToolResult(success=True, data={'words': params['text'].split()})
+        return ToolResult(success=True, data=params['text'].upper())
+
+
+def run(steps, input=None, runner=None):
+    request = PipelineRequest(steps=steps, input=input or {})
+    runner = runner or Recorder()
+    return asyncio.run(Pipeline(StubRegistry('split', 'upper', 'fail'), request, runner=runner).run()), runner
+
+
+def test_references_resolve_input_prev_steps_and_paths():
+    result, runner = run([
+        {'tool': 'split', 'inputs': {'text': '$input.sentence'}},
+        {'tool': 'upper', 'inputs': {'text': '$prev.words.1'}},
+        {'tool': 'upper', 'inputs': {'text': '$steps.0.words.-1'}},
+    ], input={'sentence': 'a quick fox'})
+
+    assert result.success
+    assert result.data == 'FOX'
+    assert [params['text'] for _, params in runner.calls] == ['a quick fox', 'quick', 'fox']
+    assert [step['items'] for step in result.metadata['steps']] == [1, 1, 1]
+
+
+def test_fixed_params_are_kept_next_to_inputs():
+    result, runner = run([{'tool': 'upper', 'params': {'text': 'x', 'other': 1}}])
+
+    assert result.data == 'X'
+    assert runner.calls == [('upper', {'text': 'x', 'other': 1})]
+
+
+@pytest.mark.parametrize('steps, message', [
+    ([{'tool': 'upper', 'inputs': {'text': '$prev'}}], '$prev used in the first step'),
+    ([{'tool': 'upper', 'params': {'text': 'a'}}, {'tool': 'upper', 'inputs': {'text': '$steps.1'}}],
+     'must name an earlier step'),
+    ([{'tool': 'upper', 'inputs': {'text': '$input.missing'}}], '$input.missing does not exist'),
+    ([{'tool': 'upper', 'inputs': {'text': '$item'}}], '$item used outside a for_each step'),
+    ([{'tool': 'upper', 'inputs': {'text': '$nowhere'}}], 'unknown reference $nowhere'),
+    ([{'tool': 'upper', 'for_each': '$input.sentence', 'inputs': {'text': '$item'}}], 'is not a list'),
+    ([{'tool': 'fail', 'params': {'text': 'a'}}], 'fail failed: boom'),
+])
+def test_bad_references_and_failures_name_the_step(steps, message):
+    result, _ = run(steps, input={'sentence': 'a b'})
+
+    assert not result.success
+    assert result.message.startswith(f'Step {len(steps) - 1}: ')
+    assert message in result.message
+
+
+def test_unknown_tool_is_rejected_before_running():
+    with pytest.raises(Exception, match='unknown tool nope'):
+        run([{'tool': 'upper', 'params': {'text': 'a'}}, {'tool': 'nope'}])
+
+
+def test_for_each_steps_stream_items_through():
+    result, runner = run([
+        {'tool': 'upper', 'for_each': '$input.words', 'inputs': {'text': '$item'}},
+        {'tool': 'upper', 'for_each': '$prev', 'inputs': {'text': '$item'}},
+    ], input={'words': ['a', 'b', 'c']})
+
+    assert result.data == ['A', 'B', 'C']
+    # Each item passes both steps before the next one starts
+    assert [params['text'] for _, params in runner.calls] == ['a', 'A', 'b', 'B', 'c', 'C']
+    assert [step['items'] for step in result.metadata['steps']] == [3, 3]
+
+
+def test_for_each_output_read_elsewhere_is_materialized():
+    result, runner = run([
+        {'tool': 'upper', 'for_each': '$input.words', 'inputs': {'text': '$item'}},
+        {'tool': 'upper', 'for_each': '$prev', 'inputs': {'text': '$item'}},
+        {'tool': 'upper', 'inputs': {'text': '$steps.0.1'}},
+    ], input={'words': ['a', 'b']})
+
+    assert result.data == 'B'
+    assert [params['text'] for _, params in runner.calls] == ['a', 'b', 'A', 'B', 'B']
+
+
+class SlowPooledTool(BaseTool):
+    pool_size = 2
+
+    def execute(self, params=None):
+        return ToolResult(success=True, data=params)
+
+    def render_ui(self):
+        pass
+
+
+@pytest.fixture
+def pooled_tool():
+    registry.register(SlowPooledTool)
+    yield SlowPooledTool.__name__
+    registry._tools.pop(SlowPooledTool.__name__, None)
+    routes._admission.pop(SlowPooledTool.__name__, None)
+
+
+def test_pooled_steps_wait_for_admission(pooled_tool, monkeypatch):
+    client = TestClient(routes.app)
+    body = {'steps': [{'tool': pooled_tool, 'params': {'text': 'a'}}]}
+
+    assert client.post('/pipelines', json=body).json()['data'] == {'text': 'a'}
+
+    # Every instance is taken by other requests
+    routes._admission[pooled_tool] = asyncio.Semaphore(0)
+    monkeypatch.setattr(routes, 'POOL_TIMEOUT', 0.1)
+    response = client.post('/pipelines', json=body)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
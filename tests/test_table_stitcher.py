@@ -0,0 +1,122 @@
+import io
+
+import pandas as pd
+
+from app.tools.core.table_stitcher import TableStitcher
+from app.tools.core.table_writers import TableWriter
+
+
+class RecordingWriter(TableWriter):
+    """Keeps every table in memory as a list of row lists"""
+
+    def __init__(self):
+        super().__init__(io.BytesIO())
+        self.tables = {}
+
+    def _begin(self, name):
+        self.tables[name] = []
+
+    def _append(self, df):
+        self.tables[self._current].extend(df.astype(str).values.tolist())
+
+
+def stitch(*tables):
+    writer = RecordingWriter()
+    stitcher = TableStitcher(writer)
+    continued = [stitcher.add(f'Table_{i}', page, df) for i, (page, df) in enumerate(tables, 1)]
+    stitcher.close()
+    return writer.tables, continued
+
+
+def test_repeated_header_continues_open_table():
+    first = pd.DataFrame([['Alice', '10'], ['Bob', '20']], columns=['Name', 'Amount'])
+    second = pd.DataFrame([['Carol', '30']], columns=['Name', 'Amount'])
+
+    tables, continued = stitch((1, first), (2, second))
+
+    assert continued == [False, True]
+    assert tables == {'Merged_Table_1': [['Alice', '10'], ['Bob', '20'], ['Carol', '30']]}
+
+
+def test_header_only_differing_in_case_and_spacing_still_repeats():
+    first = pd.DataFrame([['Alice', '10']], columns=['Name', 'Total  Amount'])
+    second = pd.DataFrame([['Bob', '20']], columns=['NAME', 'total amount'])
+
+    tables, continued = stitch((1, first), (2, second))
+
+    assert continued == [False, True]
+    assert tables['Merged_Table_1'] == [['Alice', '10'], ['Bob', '20']]
+
+
+def test_headerless_continuation_keeps_its_first_row():
+    first = pd.DataFrame([['Alice', '10'], ['Bob', '20']], columns=['Name', 'Amount'])
+    # The extractor took the first data row on the new page for a header
+    second = pd.DataFrame([['Dave', '40']], columns=['Carol', '30'])
+
+    tables, continued = stitch((1, first), (2, second))
+
+    assert continued == [False, True]
+    assert tables['Merged_Table_1'] == [['Alice', '10'], ['Bob', '20'], ['Carol', '30'], ['Dave', '40']]
+
+
+def test_new_table_with_same_width_is_not_merged():
+    first = pd.DataFrame([['Alice', '10']], columns=['Name', 'Amount'])
+    second = pd.DataFrame([['Paris', 'France']], columns=['City', 'Country'])
+
+    tables, continued = stitch((1, first), (2, second))
+
+    assert continued == [False, False]
+    assert tables == {
+        'Merged_Table_1': [['Alice', '10']],
+        'Merged_Table_2': [['Paris', 'France']],
+    }
+
+
+def test_different_width_starts_new_table():
+    first = pd.DataFrame([['Alice', '10']], columns=['Name', 'Amount'])
+    second = pd.DataFrame([['Bob', '20', 'x']], columns=['Name', 'Amount', 'Note'])
+
+    _, continued = stitch((1, first), (2, second))
+
+    assert continued == [False, False]
+
+
+def test_page_gap_starts_new_table():
+    first = pd.DataFrame([['Alice', '10']], columns=['Name', 'Amount'])
+    second = pd.DataFrame([['Bob', '20']], columns=['Name', 'Amount'])
+
+    tables, continued = stitch((1, first), (3, second))
+
+    assert continued == [False, False]
+    assert len(tables) == 2
+
+
+def test_tables_on_same_page_with_same_header_are_merged():
+    first = pd.DataFrame([['Alice', '10']], columns=['Name', 'Amount'])
+    second = pd.DataFrame([['Bob', '20']], columns=['Name', 'Amount'])
+
+    _, continued = stitch((4, first), (4, second))
+
+    assert continued == [False, True]
+
+
+def test_header_rows_repeated_inside_a_chunk_are_dropped():
+    first = pd.DataFrame([['Alice', '10']], columns=['Name', 'Amount'])
+    # Printed on every page, so the extractor also returned it as a data row
+    second = pd.DataFrame([['Name', 'Amount'], ['Bob', '20']], columns=['Name', 'Amount'])
+
+    tables, _ = stitch((1, first), (2, second))
+
+    assert tables['Merged_Table_1'] == [['Alice', '10'], ['Bob', '20']]
+
+
+def test_counts_inputs_and_outputs():
+    writer = RecordingWriter()
+    stitcher = TableStitcher(writer)
+    header = ['Name', 'Amount']
+    stitcher.add('a', 1, pd.DataFrame([['Alice', '10']], columns=header))
+    stitcher.add('b', 2, pd.DataFrame([['Bob', '20']], columns=header))
+    stitcher.add('c', 5, pd.DataFrame([['Carol', '30']], columns=header))
+    stitcher.close()
+
+    assert (stitcher.input_count, stitcher.output_count) == (3, 2)